@@ -30,9 +30,7 @@ from radstract.testdata import Cases, download_case
 
 SAVEDIR = "debug"
 
-for folder in ["debug"]:
-    if not os.path.exists(folder):
-        os.makedirs(folder)
+os.makedirs(SAVEDIR, exist_ok=True)
 
 model = ShapeDistroModels.A3
 
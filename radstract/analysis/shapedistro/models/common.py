@@ -23,6 +23,13 @@ from typing import Tuple
 import numpy as np
 import trimesh
 
+# Optional C kernel for equal-width bins, used when fast-histogram is
+# installed
+try:
+    from fast_histogram import histogram1d
+except ImportError:
+    histogram1d = None
+
 from .a3 import calculate_a3
 from .d2 import calculate_d2
 
@@ -41,6 +48,54 @@ class ShapeDistroModels:
 COMPARISON_BINS = 20
 
 
+def _uniform_histogram(
+    data: np.ndarray, bins: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    @private
+    Density histogram over equal-width bins spanning the data range,
+    matching np.histogram(data, bins=bins, density=True) exactly.
+
+    The bin of each value is computed directly from its offset, then
+    nudged against the edges so float rounding lands values the same
+    way np.histogram does, and counted with a single bincount.
+
+    When fast-histogram is installed its C kernel does the counting
+    instead. It skips the edge nudging, so a value within rounding
+    error of an inner edge may land in the neighbouring bin.
+
+    :param data: 1D array of values to bin.
+    :param bins: The number of bins.
+
+    :return: A tuple containing the histogram values and the bin edges.
+    """
+
+    data_max = float(data.max())
+    lo, hi = float(data.min()), data_max
+    if lo == hi:
+        lo, hi = lo - 0.5, hi + 0.5
+
+    edges = np.linspace(lo, hi, bins + 1)
+
+    if histogram1d is not None:
+        counts = histogram1d(data, bins=bins, range=(lo, hi))
+        # fast-histogram excludes the upper bound, np.histogram does not
+        if data_max == hi:
+            counts[-1] += np.count_nonzero(data == hi)
+        return counts / np.diff(edges) / counts.sum(), edges
+
+    indices = ((data - lo) * (bins / (hi - lo))).astype(np.intp)
+    # the maximum falls into the last, right-closed bin
+    indices[indices == bins] = bins - 1
+    indices[data < edges[indices]] -= 1
+    indices[(data >= edges[indices + 1]) & (indices != bins - 1)] += 1
+
+    counts = np.bincount(indices, minlength=bins)
+    hist = counts / np.diff(edges) / counts.sum()
+
+    return hist, edges
+
+
 def generate_distribution(
     trimesh_object: trimesh.Trimesh, model: ShapeDistroModels
 ) -> Tuple[np.ndarray, np.ndarray]:
@@ -67,7 +122,7 @@ def generate_distribution(
     data = data / np.mean(data)
 
     # Calculate histograms for both files
-    hist, bins = np.histogram(data, bins=COMPARISON_BINS, density=True)
+    hist, bins = _uniform_histogram(data, COMPARISON_BINS)
 
     # Calculate bin centers
     bin_centers = (bins[:-1] + bins[1:]) / 2
@@ -18,9 +18,11 @@ Code for working with Shape Distributions.
 Example: https://github.com/radoss-org/Radstract/tree/main/examples/analysis/shapedistro.py
 """
 
+import hashlib
 import logging
 import os
-from collections import defaultdict
+import tempfile
+from functools import lru_cache
 from typing import List, Tuple, Union
 
 import numpy as np
@@ -30,7 +32,111 @@ from nibabel import Nifti1Image
 
 from radstract.data.models import create_model_from_nifti
 
-from .models.common import ShapeDistroModels, generate_distribution
+from .models.common import (
+    COMPARISON_BINS,
+    ShapeDistroModels,
+    generate_distribution,
+)
+
+# Location of the on-disk distribution cache
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "radstract")
+
+# Bump whenever the models or create_model_from_nifti change their output,
+# so stale cache entries are not reused
+_CACHE_VERSION = 5
+
+
+def _cache_key(nifti_path: str, model: ShapeDistroModels) -> str:
+    """
+    @private
+    Content-addressed cache key for a NIfTI file and model.
+
+    :param nifti_path: Path to the NIfTI file
+    :param model: The model to be used for processing
+
+    :return: Hex digest of the file contents, model and cache version
+    """
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{_CACHE_VERSION}:{model}:".encode())
+
+    # Hash in chunks so large volumes are never fully in memory
+    with open(nifti_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=256)
+def _memoised_distribution(
+    nifti_path: str, model: ShapeDistroModels, mtime_ns: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    @private
+    In-process cache of the distribution of a NIFTI file, so a file used
+    by several plots is only meshed once. The modification time is part
+    of the key, so a rewritten file is processed again.
+
+    :param nifti_path: Path to the NIFTI file
+    :param model: The model to be used for processing
+    :param mtime_ns: Modification time of the file, in nanoseconds
+
+    :return: bin_centers, hist, both read-only as they are shared
+    """
+
+    bin_centers, hist = generate_distribution(
+        create_model_from_nifti(nifti_path), model
+    )
+
+    bin_centers.setflags(write=False)
+    hist.setflags(write=False)
+
+    return bin_centers, hist
+
+
+def _nifti_distribution(
+    nifti: Union[str, Nifti1Image],
+    model: ShapeDistroModels,
+    cache: bool = False,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    @private
+    Generate the distribution of a NIFTI, optionally through the disk cache.
+
+    :param nifti: NIFTI file or object to be processed
+    :param model: The model to be used for processing
+    :param cache: If true, cache the distribution of NIFTI files in CACHE_DIR
+
+    :return: bin_centers, hist, always writable arrays owned by the caller
+    """
+
+    if not isinstance(nifti, str):
+        return generate_distribution(create_model_from_nifti(nifti), model)
+
+    mtime_ns = os.stat(nifti).st_mtime_ns
+
+    # The memoised arrays are shared between calls, so callers get copies
+    # they are free to modify, as they do from the disk cache
+    if not cache:
+        bin_centers, hist = _memoised_distribution(nifti, model, mtime_ns)
+        return bin_centers.copy(), hist.copy()
+
+    cache_path = os.path.join(CACHE_DIR, f"{_cache_key(nifti, model)}.npz")
+
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            return cached["bin_centers"], cached["hist"]
+
+    bin_centers, hist = _memoised_distribution(nifti, model, mtime_ns)
+
+    # Write then rename, so concurrent readers never see a partial file
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=CACHE_DIR, delete=False) as f:
+        np.savez(f, bin_centers=bin_centers, hist=hist)
+    os.replace(f.name, cache_path)
+
+    return bin_centers.copy(), hist.copy()
 
 
 def rolling_average(a: np.ndarray, window_size: int) -> np.ndarray:
@@ -43,7 +149,10 @@ def rolling_average(a: np.ndarray, window_size: int) -> np.ndarray:
     :return: Array of the moving average
     """
 
-    out = np.convolve(a, np.ones(window_size), "valid") / window_size
+    # Window sums as differences of a running sum, O(N) for any window
+    cumulative = np.concatenate(([0.0], np.cumsum(a, dtype=np.float64)))
+
+    out = (cumulative[window_size:] - cumulative[:-window_size]) / window_size
 
     return out
 
@@ -52,35 +161,37 @@ def calculate_average(
     niftis: List[Union[str, Nifti1Image]],
     model: ShapeDistroModels,
     window_size: int = 5,
+    cache: bool = False,
 ) -> Tuple[np.ndarray, np.ndarray]:
     """
     Calculate the average histogram for a list of NIFTI
     files using a given model.
 
+    Every distribution has COMPARISON_BINS bins, so bin i of the
+    average is the mean of bin i (centre and value) across the files.
+
     :param niftis: List of NIFTI files to be processed
     :param model: The model to be used for processing
+    :param window_size: Window size for the rolling average
     :param cache: If true, cache the processed data
 
     :return: average_bin_centers, average_hist
     """
 
-    # defaultdict for accumulating sum and count for each bin_center
-    sum_dict = defaultdict(float)
-    count_dict = defaultdict(int)
+    # Accumulate the bin centers and histograms bin by bin
+    centers_sum = np.zeros(COMPARISON_BINS)
+    hist_sum = np.zeros(COMPARISON_BINS)
 
     for nifti in niftis:
         # Get bins and histogram for the current NIFTI file
-        ply_file = create_model_from_nifti(nifti)
-        bin_centers, hist = generate_distribution(ply_file, model)
+        bin_centers, hist = _nifti_distribution(nifti, model, cache)
 
-        # Update the sum_dict and count_dict
-        for i, bin_center in enumerate(bin_centers):
-            sum_dict[bin_center] += hist[i]
-            count_dict[bin_center] += 1
+        centers_sum += bin_centers
+        hist_sum += hist
 
     # Calculate the average histogram
-    average_bin_centers = sorted(sum_dict.keys())
-    average_hist = [sum_dict[x] / count_dict[x] for x in average_bin_centers]
+    average_bin_centers = centers_sum / len(niftis)
+    average_hist = hist_sum / len(niftis)
 
     # Apply rolling average on the calculated average histogram
     average_hist_rolled = rolling_average(average_hist, window_size)
@@ -94,7 +205,7 @@ def calculate_average(
     )  # Adjustment made here to correctly trim
     trimmed_average_bin_centers = average_bin_centers[start_index:end_index]
 
-    return np.array(trimmed_average_bin_centers), np.array(average_hist_rolled)
+    return trimmed_average_bin_centers, average_hist_rolled
 
 
 def generate_comparison_plot(
@@ -103,6 +214,7 @@ def generate_comparison_plot(
     model: ShapeDistroModels,
     title: str = "Comparison",
     extra_plots: dict = None,
+    cache: bool = False,
 ) -> plt.figure:
     """
     Assuming niftis is a list of lists, with each list
@@ -114,6 +226,7 @@ def generate_comparison_plot(
     :param model: The model to be used for processing
     :param title: Title of the plot
     :param extra_plots: Extra plots to be included in the plot
+    :param cache: If true, cache the processed data
 
     :return: The plot
 
@@ -130,10 +243,8 @@ def generate_comparison_plot(
             if not os.path.exists(nifti):
                 raise ValueError(f"File {nifti} does not exist")
 
-            ply_file = create_model_from_nifti(nifti)
-            bin_centers, hist = generate_distribution(ply_file, model)
+            bin_centers, hist = _nifti_distribution(nifti, model, cache)
 
-            # Save this to cache file
             plt.plot(
                 bin_centers,
                 hist,
@@ -174,13 +285,16 @@ def generate_comparison_plot(
 
 
 def get_plot_data(
-    niftis: List[Union[str, Nifti1Image]], model: ShapeDistroModels
+    niftis: List[Union[str, Nifti1Image]],
+    model: ShapeDistroModels,
+    cache: bool = False,
 ) -> dict:
     """
     Get the plot data for a list of NIFTI files using a given model.
 
     :param niftis: List of NIFTI files to be processed
     :param model: The model to be used for processing
+    :param cache: If true, cache the processed data
 
     :return: The plot data
 
@@ -195,8 +309,7 @@ def get_plot_data(
             if not os.path.exists(nifti):
                 raise ValueError(f"File {nifti} does not exist")
 
-            ply_file = create_model_from_nifti(nifti)
-            bin_centers, hist = generate_distribution(ply_file, model)
+            bin_centers, hist = _nifti_distribution(nifti, model, cache)
 
         data.setdefault(key, []).append((bin_centers, hist))
 
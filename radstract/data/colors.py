@@ -19,7 +19,6 @@ Examples:
 - https://github.com/radoss-org/Radstract/tree/main/examples/data/colors.py
 """
 
-import time
 from typing import Tuple
 
 import numpy as np
@@ -46,51 +45,101 @@ class LabelColours:
     BLACK = (0, 0, 0)  # Black
     used_labels = [LABEL1, LABEL2, LABEL3, LABEL4, LABEL5, LABEL6]
 
+    # colour -> key lookup, kept in sync with used_labels
+    _colour_keys = dict(zip(used_labels, range(1, len(used_labels) + 1)))
+
+    # packed colour -> key lookup table, built by get_colour_keys and kept
+    # in sync with used_labels from then on. Colours without a key yet
+    # hold _UNKNOWN_KEY
+    _key_lut = None
+    _UNKNOWN_KEY = np.iinfo(np.uint16).max
+
+    # index -> colour lookup table, extended on demand by get_palette
+    _palette = np.zeros((1, 3), dtype=np.uint8)
+    _palette.flags.writeable = False
+
+    # array version of used_labels, for vectorised distance checks
+    _used_array = np.empty((0, 3), dtype=np.int32)
+
     random = np.random.default_rng(42)
 
+    # Draws spent looking for a colour far from all used ones. Only ~26
+    # colours fit that spacing, so once a search runs out of draws any
+    # unused colour is accepted instead, keeping generation bounded and
+    # deterministic.
+    _SPACED_DRAWS = 10000
+    _spaced = True
+
+    # Number of colours get_colour_key generates while looking for a key
+    _MAX_SEARCH_LABELS = 1024
+
     @classmethod
     def _generate_new_color(self):
         """
         Generates a new color ensuring it's not similar
-        to predefined or previously generated colors.
+        to predefined or previously generated colors,
+        or just unused once no such colour is left.
         """
 
+        draws = 0
+
         while True:
             new_color = (
                 self.random.integers(0, 255),
                 self.random.integers(0, 255),
                 self.random.integers(0, 255),
             )
-            if not self._is_similar(new_color):
-                self.used_labels.append(new_color)
-                return new_color
+
+            if self._spaced:
+                if not self._is_similar(new_color):
+                    break
+
+                draws += 1
+                if draws >= self._SPACED_DRAWS:
+                    self._spaced = False
+
+            elif (
+                new_color not in self._colour_keys and new_color != self.BLACK
+            ):
+                break
+
+        self.used_labels.append(new_color)
+        self._colour_keys[new_color] = len(self.used_labels)
+
+        if self._key_lut is not None:
+            red, green, blue = map(int, new_color)
+            self._key_lut[(red << 16) | (green << 8) | blue] = len(
+                self.used_labels
+            )
+
+        return new_color
 
     @classmethod
     def _is_similar(self, new_color):
         """Check if the new color is too close to any used colors."""
-        return any(
-            self._color_distance(new_color, old_color) < 100
-            for old_color in self.used_labels
-        )
 
-    @classmethod
-    def _color_distance(self, c1, c2):
-        """Calculate the Euclidean distance between two colors."""
-        return sum((a - b) ** 2 for a, b in zip(c1, c2)) ** 0.5
+        # (K, 3) copy of used_labels, rebuilt whenever the list has grown
+        if len(self._used_array) != len(self.used_labels):
+            self._used_array = np.array(self.used_labels, dtype=np.int32)
+
+        # Squared distances, so no sqrt is needed: distance < 100
+        differences = self._used_array - np.asarray(new_color, dtype=np.int32)
+        return bool(
+            ((differences * differences).sum(axis=1) < 100 * 100).any()
+        )
 
     @classmethod
     def _label_colour_gen(self):
         """
         Generator that yields all predefined
-        colors and then new unique colors indefinitely.
+        colors and then new unique colors,
+        up to _MAX_SEARCH_LABELS colors.
         """
-        timeout = 5
-        start_time = time.time()
 
         for color in self.used_labels:
             yield color
 
-        while time.time() - start_time < timeout:
+        while len(self.used_labels) < self._MAX_SEARCH_LABELS:
             yield self._generate_new_color()
 
     @classmethod
@@ -106,10 +155,39 @@ class LabelColours:
         if index == 0:
             return cls.BLACK
 
-        # Use label_colour_gen to get the color
-        for i, color in enumerate(cls._label_colour_gen()):
-            if i == (index - 1):
-                return color
+        # Generate colours until the index exists
+        while len(cls.used_labels) < index:
+            cls._generate_new_color()
+
+        return cls.used_labels[index - 1]
+
+    @classmethod
+    def get_palette(cls, num_labels: int) -> np.ndarray:
+        """
+        Get the colours of the first num_labels indices as a lookup table,
+        so label arrays can be coloured with palette[labels].
+
+        :param num_labels: The number of labels, including the background.
+
+        :return: A read-only (num_labels, 3) uint8 array, row i being the
+        colour of index i.
+        """
+
+        # Colours never change once generated, so only the missing rows
+        # of the cached table are looked up
+        if len(cls._palette) < num_labels:
+            new_colours = np.array(
+                [
+                    cls.get_color_from_index(i)
+                    for i in range(len(cls._palette), num_labels)
+                ],
+                dtype=np.uint8,
+            )
+            palette = np.concatenate([cls._palette, new_colours])
+            palette.flags.writeable = False
+            cls._palette = palette
+
+        return cls._palette[:num_labels]
 
     @classmethod
     def get_colour_key(
@@ -132,12 +210,87 @@ class LabelColours:
         if colour == background:
             return 0
 
+        if colour in cls._colour_keys:
+            return cls._colour_keys[colour]
+
+        # Not generated yet, keep generating colours to look for it
         for i, color in enumerate(cls._label_colour_gen()):
             if color == colour:
                 return i + 1
 
         return None
 
+    @classmethod
+    def get_colour_keys(cls, keys: np.ndarray) -> np.ndarray:
+        """
+        Get the colour keys for an array of packed colours, as
+        get_colour_key would with a black background.
+
+        :param keys: Colours packed as (red << 16) | (green << 8) | blue.
+
+        :return: uint16 array of colour keys, shaped like keys.
+
+        :raises ValueError: If a colour is not a label colour.
+        """
+
+        if cls._key_lut is None:
+            key_lut = np.full(1 << 24, cls._UNKNOWN_KEY, dtype=np.uint16)
+            key_lut[0] = 0
+            for key, colour in enumerate(cls.used_labels, 1):
+                red, green, blue = map(int, colour)
+                key_lut[(red << 16) | (green << 8) | blue] = key
+            cls._key_lut = key_lut
+
+        colour_keys = cls._key_lut.take(keys, mode="clip")
+
+        unknown = colour_keys == cls._UNKNOWN_KEY
+        if unknown.any():
+            # Colours not generated yet are searched for once, which adds
+            # them to the table
+            unknown_keys = keys[unknown]
+            for key in np.unique(unknown_keys).tolist():
+                colour = (key >> 16, (key >> 8) & 0xFF, key & 0xFF)
+                if cls.get_colour_key(colour) is None:
+                    raise ValueError(f"Colour {colour} is not a label colour.")
+
+            colour_keys[unknown] = cls._key_lut[unknown_keys]
+
+        return colour_keys
+
+
+def _pack_rgb(array: np.ndarray) -> np.ndarray:
+    """
+    @private
+    Pack the RGB channels of an (..., 3) array into single uint32 keys,
+    so each pixel can be compared or sorted as one scalar.
+
+    :param array: Array with RGB colours on the last axis.
+
+    :return: Array of packed colour keys.
+    """
+
+    # Widening one channel at a time avoids a full (..., 3) uint32 copy
+    array = np.asarray(array)
+    keys = array[..., 0].astype(np.uint32) << 16
+    keys |= array[..., 1].astype(np.uint32) << 8
+    keys |= array[..., 2]
+    return keys
+
+
+def _unpack_rgb(keys: np.ndarray) -> np.ndarray:
+    """
+    @private
+    Inverse of _pack_rgb.
+
+    :param keys: Array of packed colour keys.
+
+    :return: Array with RGB colours on the last axis.
+    """
+
+    return np.stack(
+        [(keys >> 16) & 0xFF, (keys >> 8) & 0xFF, keys & 0xFF], axis=-1
+    ).astype(np.uint8)
+
 
 def get_unique_colours(
     img: Image.Image = None, array: np.ndarray = None
@@ -148,7 +301,7 @@ def get_unique_colours(
     :param img: Pillow image to be processed.
     :param array: Numpy array to be processed.
 
-    :return: List of unique colours in the image.
+    :return: Sorted tuple of unique colours in the image.
 
     :raises ValueError: If both img and array are provided.
     """
@@ -157,20 +310,22 @@ def get_unique_colours(
         raise ValueError("Only one of img or array must be provided.")
 
     elif img is not None:
-        unique_colors = img.convert("RGB").getcolors()
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        array = np.asarray(img)
 
     elif array is not None:
-        unique_colors = Image.fromarray(array).convert("RGB").getcolors()
+        # Only other layouts need PIL to bring them to 8-bit RGB
+        array = np.asarray(array)
+        if array.dtype != np.uint8 or array.ndim != 3 or array.shape[-1] != 3:
+            array = np.asarray(Image.fromarray(array).convert("RGB"))
 
     else:
         raise ValueError("Either img or array must be provided.")
 
-    if unique_colors is None:
-        return ()
+    unique_keys = np.unique(_pack_rgb(array))
 
-    # since these return count, colour, only return the 2nd element of each tuple
-    unique_colors = tuple([colour for _, colour in unique_colors])
-    return unique_colors
+    return tuple(map(tuple, _unpack_rgb(unique_keys).tolist()))
 
 
 def change_color(
@@ -189,7 +344,27 @@ def change_color(
     """
 
     data = np.array(img)
-    mask = np.all(data == old_color, axis=-1)
+
+    if data.dtype == np.uint8 and data.ndim == 3 and data.shape[-1] == 4:
+        # Compare each RGBA pixel as one uint32. Alpha is part of the
+        # match for an RGBA old_color and masked out for an RGB one. Key
+        # and mask are built from bytes, so they match the native byte
+        # order of the view
+        pixels = data.view(np.uint32)[..., 0]
+        if len(old_color) == 4:
+            key = np.frombuffer(bytes(old_color), dtype=np.uint32)
+            mask = pixels == key[0]
+        else:
+            key = np.frombuffer(bytes(old_color) + b"\0", dtype=np.uint32)
+            rgb_mask = np.frombuffer(b"\xff\xff\xff\0", dtype=np.uint32)
+            mask = (pixels & rgb_mask[0]) == key[0]
+    else:
+        # per-channel ANDs avoid the (H, W, 3) temporary of np.all(axis=-1)
+        mask = (
+            (data[..., 0] == old_color[0])
+            & (data[..., 1] == old_color[1])
+            & (data[..., 2] == old_color[2])
+        )
 
     data[mask] = new_color
 
@@ -203,18 +378,17 @@ def convert_labels_to_image(slice_data: np.ndarray) -> np.ndarray:
 
     :param slice_data: The slice data to apply the colour map to.
 
-    :return: The colour mapped data.
+    :return: The colour mapped data, as a uint8 RGB array.
     """
 
-    color_mapped_data = np.zeros((slice_data.shape[0], slice_data.shape[1], 3))
+    slice_data = np.asarray(slice_data)
+    if not np.issubdtype(slice_data.dtype, np.integer):
+        slice_data = slice_data.astype(np.intp)
 
-    for mask in np.sort(np.unique(slice_data)):
-        if mask != 0:
-            color_mapped_data[
-                slice_data == mask
-            ] = LabelColours.get_color_from_index(int(mask))
+    # One gather through the palette instead of a mask per label
+    palette = LabelColours.get_palette(int(slice_data.max(initial=0)) + 1)
 
-    return color_mapped_data
+    return palette[slice_data]
 
 
 def fast_check_all_black(img: Image) -> bool:
@@ -226,7 +400,10 @@ def fast_check_all_black(img: Image) -> bool:
     :return: True if the image is all black, False otherwise.
     """
 
-    result = np.array(img).sum()
-    if result == 0:
-        return True
-    return False
+    # getbbox scans the pixel buffer in C without copying it to numpy,
+    # alpha_only=False so all bands count, as with arrays
+    if isinstance(img, Image.Image):
+        return img.getbbox(alpha_only=False) is None
+
+    # any() stops at the first non-zero byte, unlike sum()
+    return not np.asarray(img).any()
@@ -22,18 +22,26 @@ Examples: https://github.com/radoss-org/Radstract/tree/main/examples/data/dicom_
 
 """
 
+import hashlib
+import math
+import os
 import random
 import warnings
-from io import BytesIO
-from typing import List
+from collections import deque
+from typing import List, Optional, Union
 
 import numpy as np
 import pydicom
 from PIL import Image
 from pydicom.dataset import FileMetaDataset
+from pydicom.encaps import encapsulate, generate_frames
+from pydicom.filebase import DicomBytesIO
+from pydicom.filewriter import write_file_meta_info
+from pydicom.sequence import Sequence
 from pydicom.uid import JPEG2000
 
 from radstract.data.dicom.utils import DicomTypes, Modalities
+from radstract.data.images import stack_images
 
 from .utils import DicomTypes
 
@@ -44,6 +52,15 @@ class PlaceHolderTag:
     UseOldTagUID = "1.1"
 
 
+# A tuple rather than a set: values such as PersonName compare equal to
+# the placeholder strings but do not hash like them
+_PLACEHOLDERS = (
+    PlaceHolderTag.UseOldTagStr,
+    PlaceHolderTag.UseOldTagInt,
+    PlaceHolderTag.UseOldTagUID,
+)
+
+
 def _set_defaults(dicom: pydicom.Dataset) -> pydicom.Dataset:
     """
     Sets the default tags for a new DICOM file.
@@ -89,6 +106,27 @@ def _set_series(dicom: pydicom.Dataset) -> pydicom.Dataset:
     return dicom
 
 
+def _generate_uids(count: int) -> List[pydicom.uid.UID]:
+    """
+    @private
+    Generate random UIDs in the same form as pydicom.uid.generate_uid,
+    drawing the entropy for all of them from a single os.urandom call.
+
+    :param count: The number of UIDs to generate.
+
+    :return: List of UIDs under the pydicom root.
+    """
+
+    raw = os.urandom(16 * count)
+    prefix = pydicom.uid.PYDICOM_ROOT_UID
+
+    # UIDs are limited to 64 characters
+    return [
+        pydicom.uid.UID(f"{prefix}{int.from_bytes(raw[i:i + 16], 'big')}"[:64])
+        for i in range(0, len(raw), 16)
+    ]
+
+
 def add_anon_tags(
     dicom: pydicom.Dataset, keyint: int = None
 ) -> pydicom.Dataset:
@@ -108,9 +146,11 @@ def add_anon_tags(
 
     key = f"radstract-{keyint}"
 
-    dicom.SeriesInstanceUID = pydicom.uid.generate_uid()
-    dicom.SOPInstanceUID = pydicom.uid.generate_uid()
-    dicom.StudyInstanceUID = pydicom.uid.generate_uid()
+    (
+        dicom.SeriesInstanceUID,
+        dicom.SOPInstanceUID,
+        dicom.StudyInstanceUID,
+    ) = _generate_uids(3)
 
     dicom.SeriesNumber = keyint
 
@@ -139,14 +179,14 @@ def create_empty_dicom(
 
     if dicom_type not in DicomTypes.ALL_TYPES:
         raise NotImplementedError(
-            f"Dicom type {dicom_type} not"
-            " implemented yet. Please choose from {DicomTypes.ALL_TYPES}"
+            f"Dicom type {dicom_type} not implemented yet."
+            f" Please choose from {sorted(DicomTypes.ALL_TYPES)}"
         )
 
     if modality not in Modalities.ALL_MODALITIES:
         raise NotImplementedError(
-            f"Modality {modality} not"
-            " implemented yet. Please choose from {Modalities.ALL_MODALITIES}"
+            f"Modality {modality} not implemented yet."
+            f" Please choose from {sorted(Modalities.ALL_MODALITIES)}"
         )
 
     new_dicom = pydicom.Dataset()
@@ -196,10 +236,19 @@ def add_tags(
     :return: New DICOM dataset with specified tags transferred.
     """
 
-    def replace_tags(new_element, old_element):
+    # (new, old) dataset pairs still to be filled, sequence items are
+    # queued instead of recursed into, so nesting depth is unbounded
+    pending = deque([(empty_new_dicom, old_dicom)])
+
+    while pending:
+        new_element, old_element = pending.popleft()
+
         for tag in new_element.dir():
-            # If it's a sequence, apply the logic recursively
-            if isinstance(new_element[tag].value, pydicom.sequence.Sequence):
+            element = new_element[tag]
+            new_value = element.value
+
+            # If it's a sequence, fill its items pairwise
+            if isinstance(new_value, Sequence):
                 # check old element has tag
                 if not hasattr(old_element, tag):
                     warnings.warn(
@@ -207,33 +256,93 @@ def add_tags(
                         f"Skipping it."
                     )
                     continue
-                for sub_item_new, sub_item_old in zip(
-                    new_element[tag], old_element[tag]
-                ):
-                    replace_tags(sub_item_old, sub_item_new)
-                    # print(f"Replacing Sequence {tag}")
+                pending.extend(zip(new_value, old_element[tag].value))
             # If tag is marked to be replaced from old DICOM
-            elif hasattr(old_element, tag) and getattr(new_element, tag) in [
-                PlaceHolderTag.UseOldTagStr,
-                PlaceHolderTag.UseOldTagInt,
-                PlaceHolderTag.UseOldTagUID,
-            ]:
+            elif hasattr(old_element, tag) and new_value in _PLACEHOLDERS:
                 setattr(new_element, tag, getattr(old_element, tag))
             # Otherwise, if tag is marked to be replaced from old DICOM
             # and it's not present in the old DICOM, skip it
             else:
                 warnings.warn(
-                    f"Tag {new_element[tag].name} not found in old DICOM dataset. "
+                    f"Tag {element.name} not found in old DICOM dataset. "
                     f"Skipping it."
                 )
 
-    replace_tags(empty_new_dicom, old_dicom)
-
     return empty_new_dicom
 
 
+def _compress_frames(
+    dicom: pydicom.Dataset,
+    compress_ratio: int,
+    transfer_syntax: str = JPEG2000,
+) -> pydicom.Dataset:
+    """
+    @private
+    Compress the pixel data of a DICOM, encoding each distinct frame
+    only once.
+
+    Repeated frames (e.g. static cine loops) reuse the encoded bytes of
+    their first occurrence.
+
+    :param dicom: pydicom Dataset object, with uncompressed 8-bit frames
+    as its pixel data.
+    :param compress_ratio: The compression ratio, for lossy JPEG2000.
+    :param transfer_syntax: The transfer syntax to compress with.
+
+    :return: pydicom Dataset object with compressed pixel data.
+    """
+
+    # Only lossy JPEG2000 takes a target ratio, the others are lossless
+    encoding_kwargs = {}
+    if transfer_syntax == JPEG2000:
+        encoding_kwargs["j2k_cr"] = [compress_ratio]
+
+    # View the frames in place, the trailing pad byte of odd lengths
+    # is excluded by count
+    shape = (dicom.NumberOfFrames, dicom.Rows, dicom.Columns)
+    if dicom.SamplesPerPixel > 1:
+        shape += (dicom.SamplesPerPixel,)
+    frames = np.frombuffer(
+        dicom.PixelData, dtype=np.uint8, count=math.prod(shape)
+    ).reshape(shape)
+
+    # index of the first occurrence of each distinct frame
+    first_indices = {}
+    frame_map = []
+
+    for index, frame in enumerate(frames):
+        digest = hashlib.blake2b(frame.tobytes(), digest_size=16).digest()
+        frame_map.append(first_indices.setdefault(digest, index))
+
+    if len(first_indices) == len(frames):
+        return dicom.compress(transfer_syntax, **encoding_kwargs)
+
+    unique_indices = list(first_indices.values())
+    num_frames = dicom.NumberOfFrames
+
+    dicom.NumberOfFrames = len(unique_indices)
+    dicom.compress(
+        transfer_syntax, arr=frames[unique_indices], **encoding_kwargs
+    )
+
+    encoded = dict(
+        zip(
+            unique_indices,
+            generate_frames(
+                dicom.PixelData, number_of_frames=len(unique_indices)
+            ),
+        )
+    )
+
+    dicom.NumberOfFrames = num_frames
+    dicom.PixelData = encapsulate([encoded[index] for index in frame_map])
+    dicom["PixelData"].is_undefined_length = True
+
+    return dicom
+
+
 def convert_images_to_dicom(
-    images: List[Image.Image],
+    images: Union[List[Image.Image], np.ndarray],
     empty_dicom: pydicom.Dataset = None,
     old_dicom: pydicom.Dataset = None,
     compress_ratio: int = 1,
@@ -241,19 +350,29 @@ def convert_images_to_dicom(
     keyint: int = None,
     modality: str = Modalities.ULTRASOUND,
     dicom_type: DicomTypes = DicomTypes.SERIES_ANONYMIZED,
+    transfer_syntax: Optional[str] = None,
 ) -> pydicom.Dataset:
     """
     Converts a list of images to a DICOM dataset, transferring specified tags.
 
-    :param images: List of PIL Image objects.
+    :param images: List of PIL Image objects, or the frames already
+        stacked as one (N, H, W, C) uint8 array.
     :param empty_dicom: An empty DICOM with the tags to transfer to the new dataset.
     :param old_dicom: The original DICOM dataset to transfer tags from.
     :param compress_ratio: Optional scalar for resizing.
     :param itk_snap_name: Will add name information to SeriesDescription&PatientID tag.
     :param keyint: The key to use for anonymization.
     :param modality: The modality of the DICOM file.
+    :param transfer_syntax: Transfer syntax UID to compress with, e.g.
+        JPEG2000Lossless or HTJ2K where the installed pydicom can encode
+        it. When given, the frames are always compressed, and
+        compress_ratio only applies to lossy JPEG2000. When None, a
+        compress_ratio above 1 compresses with lossy JPEG2000.
 
     :return: New DICOM dataset with specified tags transferred, and image
+
+    :raises ValueError: If images is empty, or both empty_dicom and keyint
+        are provided.
     """
 
     if empty_dicom and keyint:
@@ -280,25 +399,42 @@ def convert_images_to_dicom(
         bits_stored = 8
         pmi = "RGB"
 
-    data = np.stack(images, axis=0)
+    if len(images) == 0:
+        raise ValueError("images cannot be empty")
+
+    # An array is already stacked, so its frames skip PIL and the copy
+    if isinstance(images, np.ndarray):
+        data = images
+    else:
+        data = stack_images(images)
 
     empty_dicom.set_pixel_data(
         data, photometric_interpretation=pmi, bits_stored=bits_stored
     )
 
-    if compress_ratio > 1:
-        empty_dicom.compress(JPEG2000, j2k_cr=[compress_ratio])
+    # The dataset holds its own copy of the pixels now, dropping the
+    # array keeps it from being resident alongside the encoded frames
+    del data
 
-    # validate
-    pydicom.dataset.validate_file_meta(
-        empty_dicom.file_meta, enforce_standard=True
-    )
+    if transfer_syntax is None and compress_ratio > 1:
+        transfer_syntax = JPEG2000
 
-    # forces write_like_original=False
-    with BytesIO() as output:
-        new_dicom.save_as(output, enforce_file_format=True)
-        output.seek(0)
-        new_dicom = pydicom.dcmread(output)
+    if transfer_syntax is not None:
+        _compress_frames(empty_dicom, compress_ratio, transfer_syntax)
+
+    # Complete the File Meta Information and preamble the way
+    # save_as(enforce_file_format=True) would, without writing and
+    # re-reading the whole pixel data
+    file_meta = new_dicom.file_meta
+    file_meta.MediaStorageSOPClassUID = new_dicom.SOPClassUID
+    file_meta.MediaStorageSOPInstanceUID = new_dicom.SOPInstanceUID
+
+    # Writing just the meta group validates it and sets its group length
+    write_file_meta_info(DicomBytesIO(), file_meta, enforce_standard=True)
+
+    new_dicom = pydicom.FileDataset(
+        None, new_dicom, preamble=b"\x00" * 128, file_meta=file_meta
+    )
 
     if itk_snap_name:
         new_dicom.SeriesDescription = itk_snap_name
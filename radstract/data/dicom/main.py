@@ -18,17 +18,37 @@ Handles the conversion of DICOM datasets to images.
 Example: https://github.com/radoss-org/Radstract/tree/main/examples/data/dicom_import.py
 """
 
-from typing import List, Tuple
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 
+import numpy as np
 import pydicom
 from PIL import Image
+from pydicom.encaps import generate_frames
+from pydicom.pixels import pixel_array
+from pydicom.uid import (
+    JPEG2000,
+    JPEG2000Lossless,
+    JPEGBaseline8Bit,
+    JPEGExtended12Bit,
+    JPEGLosslessSV1,
+)
+
+# Optional GPU decoding, used when nvImageCodec is installed
+try:
+    from nvidia import nvimgcodec
+except ImportError:
+    nvimgcodec = None
 
 from radstract.data.dicom.utils import DicomTypes
 from radstract.data.images import (
+    NoiseReducer,
     NoiseReductionFilter,
     crop_and_resize,
-    reduce_noise,
 )
+from radstract.data.images.filters import _cuda_disabled
 
 
 class PhotometricInterpretation:
@@ -38,12 +58,120 @@ class PhotometricInterpretation:
     MONOCHROME2 = "MONOCHROME2"
 
 
+_GPU_TRANSFER_SYNTAXES = frozenset(
+    {
+        JPEGBaseline8Bit,
+        JPEGExtended12Bit,
+        JPEGLosslessSV1,
+        JPEG2000Lossless,
+        JPEG2000,
+    }
+)
+
+
+def _decode_frames_gpu(dicom: pydicom.Dataset) -> Optional[np.ndarray]:
+    """
+    @private
+    Decode 8-bit colour JPEG/JPEG2000 pixel data on the GPU with nvImageCodec.
+
+    Lossy JPEG may differ by a grey level from the CPU decoders, as the
+    IDCT implementations differ. Setting RADSTRACT_DISABLE_CUDA to 1 keeps
+    decoding on the CPU.
+
+    :param dicom: pydicom Dataset object.
+
+    :return: The decoded pixel data in the same shape as dicom.pixel_array,
+    or None if nvImageCodec is unavailable or cannot handle the dataset.
+    """
+
+    if (
+        nvimgcodec is None
+        or _cuda_disabled()
+        or "TransferSyntaxUID" not in dicom.file_meta
+        or dicom.file_meta.TransferSyntaxUID not in _GPU_TRANSFER_SYNTAXES
+        or dicom.get("SamplesPerPixel") != 3
+        or dicom.get("BitsAllocated") != 8
+    ):
+        return None
+
+    num_frames = int(dicom.get("NumberOfFrames", 1) or 1)
+    encoded = list(
+        generate_frames(dicom.PixelData, number_of_frames=num_frames)
+    )
+
+    try:
+        decoded = nvimgcodec.Decoder().decode(encoded)
+    except Exception:
+        # Any failure, e.g. no CUDA device or a codestream the library
+        # rejects, falls back to the CPU decoders rather than escaping
+        return None
+
+    if len(decoded) != num_frames or any(image is None for image in decoded):
+        return None
+
+    frames = np.stack([np.asarray(image.cpu()) for image in decoded])
+
+    # pixel_array only keeps the frame axis for more than one frame
+    return frames if num_frames > 1 else frames[0]
+
+
+def _decode_frames(
+    dicom: pydicom.Dataset, threads: Optional[int] = None
+) -> np.ndarray:
+    """
+    @private
+    Decode the pixel data of a DICOM dataset.
+
+    Supported compressed datasets are decoded on the GPU when nvImageCodec
+    is installed. Otherwise compressed multi-frame datasets are decoded one
+    frame per task in a thread pool, as the JPEG decoders release the GIL,
+    and written into a single preallocated array.
+
+    :param dicom: pydicom Dataset object.
+    :param threads: Maximum number of decoding threads, one decodes the
+        frames sequentially. Defaults to the number of CPUs.
+
+    :return: The decoded pixel data, in the shape of dicom.pixel_array.
+    """
+
+    frames = _decode_frames_gpu(dicom)
+
+    if frames is not None:
+        return frames
+
+    num_frames = int(dicom.get("NumberOfFrames", 1) or 1)
+    if threads is None:
+        threads = os.cpu_count() or 1
+    workers = min(threads, num_frames)
+
+    if (
+        workers < 2
+        or "TransferSyntaxUID" not in dicom.file_meta
+        or not dicom.file_meta.TransferSyntaxUID.is_compressed
+    ):
+        return dicom.pixel_array
+
+    first = pixel_array(dicom, index=0)
+    frames = np.empty((num_frames, *first.shape), dtype=first.dtype)
+    frames[0] = first
+
+    def decode(index: int) -> None:
+        frames[index] = pixel_array(dicom, index=index)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # consume the iterator so worker exceptions are raised here
+        list(executor.map(decode, range(1, num_frames)))
+
+    return frames
+
+
 def convert_dicom_to_images(
     old_dicom: pydicom.Dataset,
     crop_coordinates: Tuple[int, int, int, int] = None,
     compress_factor: int = 1,
     dicom_type: str = DicomTypes.DEFAULT,
     noise_filters: List[NoiseReductionFilter] = NoiseReductionFilter.DEFAULT,
+    threads: int = 1,
 ) -> Image.Image:
     """
     Converts a DICOM dataset to a new format, transferring specified tags,
@@ -54,6 +182,9 @@ def convert_dicom_to_images(
     :param compress_factor: Optional scalar for resizing.
     :param dicom_type: The DICOM Type from the DicomTypes Enum.
     :param noise_filters: Optional list of NoiseReductionFilter enums.
+    :param threads: Number of threads to decode and process the frames
+        with, one runs both sequentially. Any LAMBDA_FILTER functions must
+        be thread-safe when it is above one.
 
     :return: New DICOM dataset with specified tags transferred, and image
     cropped and resized if specified.
@@ -63,29 +194,69 @@ def convert_dicom_to_images(
 
     if dicom_type not in DicomTypes.ALL_TYPES:
         raise NotImplementedError(
-            f"Dicom type {dicom_type} not implemented yet. Please choose from {DicomTypes.ALL_TYPES}"
+            f"Dicom type {dicom_type} not implemented yet. Please choose from {sorted(DicomTypes.ALL_TYPES)}"
         )
 
-    images = []
-
-    trigger = False
-    data = old_dicom.pixel_array
+    data = _decode_frames(old_dicom, threads)
 
+    # A single frame has no frame axis, add it so both types share a loop
     if dicom_type == DicomTypes.SINGLE:
-        data = [old_dicom.pixel_array]
+        data = data[np.newaxis]
+
+    resize_to = None
 
-    for frame in data:
-        # See https://github.com/pydicom/pydicom/issues/533
-        if not trigger:
-            trigger = True
+    # A crop inside the frames is one copy of a slice of the whole cube,
+    # so only the cropped pixels are converted afterwards. The copy keeps
+    # the frames contiguous, as PIL is far slower to import strided
+    # arrays. Crops past the edges still go through PIL, which pads them
+    # with black.
+    if crop_coordinates:
+        x, y, width, height = crop_coordinates
+        frame_height, frame_width = data.shape[1:3]
 
+        if (
+            x >= 0
+            and y >= 0
+            and x + width <= frame_width
+            and y + height <= frame_height
+        ):
+            data = np.ascontiguousarray(data[:, y : y + height, x : x + width])
+            resize_to = (
+                int(width / compress_factor),
+                int(height / compress_factor),
+            )
+            crop_coordinates = None
+
+    # Frames share a size, so each thread filters its frames with one
+    # NoiseReducer that reuses its arrays from frame to frame
+    reducers = threading.local()
+
+    def process_frame(frame: np.ndarray) -> Image.Image:
         image = Image.fromarray(frame)
-        image = image.convert("RGB")
 
-        image = crop_and_resize(image, crop_coordinates, compress_factor)
+        # converting an RGB image to RGB would only copy it
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+
+        # Without a crop, crop_and_resize keeps the size (compress_factor
+        # only applies to crops), so that case skips it entirely
+        if resize_to is not None:
+            if image.size != resize_to:
+                image = image.resize(resize_to)
+        elif crop_coordinates:
+            image = crop_and_resize(image, crop_coordinates, compress_factor)
+
+        if noise_filters:
+            if not hasattr(reducers, "reducer"):
+                reducers.reducer = NoiseReducer(noise_filters)
+            image = reducers.reducer.reduce(image)
 
-        image = reduce_noise(image, noise_filters)
+        return image
 
-        images.append(image)
+    if threads == 1:
+        return [process_frame(frame) for frame in data]
 
-    return images
+    # PIL and OpenCV release the GIL in their kernels, so frames can be
+    # processed concurrently
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(process_frame, data))
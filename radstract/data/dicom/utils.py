@@ -26,22 +26,31 @@ class DicomTypes:
     SINGLE_ANONYMIZED = "SINGLE_ANONYMIZED"
     DEFAULT = SERIES
 
-    ALL_TYPES = [SERIES, SERIES_ANONYMIZED, SINGLE, DEFAULT, SINGLE_ANONYMIZED]
-
-    ALL_SERIES = [
-        SERIES,
-        SERIES_ANONYMIZED,
-    ]
-
-    ANON = [
-        SERIES_ANONYMIZED,
-        SINGLE_ANONYMIZED,
-    ]
+    # frozensets, as these are only used for membership tests
+    ALL_TYPES = frozenset(
+        {SERIES, SERIES_ANONYMIZED, SINGLE, SINGLE_ANONYMIZED}
+    )
+
+    ALL_SERIES = frozenset(
+        {
+            SERIES,
+            SERIES_ANONYMIZED,
+        }
+    )
+
+    ANON = frozenset(
+        {
+            SERIES_ANONYMIZED,
+            SINGLE_ANONYMIZED,
+        }
+    )
 
 
 class Modalities:
     ULTRASOUND = "1.2.840.10008.5.1.4.1.1.1"
 
-    ALL_MODALITIES = [
-        ULTRASOUND,
-    ]
+    ALL_MODALITIES = frozenset(
+        {
+            ULTRASOUND,
+        }
+    )
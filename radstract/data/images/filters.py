@@ -18,8 +18,10 @@ Compose System for handling image filters.
 Examples: https://github.com/radoss-org/Radstract/tree/main/examples/data/filters.py
 """
 
+import os
 import warnings
-from typing import List
+from functools import lru_cache
+from typing import List, Optional
 
 import cv2
 import numpy as np
@@ -65,53 +67,338 @@ class NoiseReductionFilter:
     DEFAULT = []
 
 
-def reduce_noise(
-    image: Image.Image, filters_compose: List[NoiseReductionFilter] = []
-) -> Image.Image:
+# filter type -> function applying it to an OpenCV image, given its
+# parameters and an optional array to write the result to
+_FILTER_DISPATCH = {
+    NoiseReductionFilter.MEDIAN_FILTER.type: lambda image_cv, params, dst: (
+        cv2.medianBlur(image_cv, params.size, dst=dst)
+    ),
+    NoiseReductionFilter.GAUSSIAN_BLUR.type: lambda image_cv, params, dst: (
+        cv2.GaussianBlur(image_cv, params.kernel_size, 0, dst=dst)
+    ),
+    NoiseReductionFilter.BILATERAL_FILTER.type: lambda image_cv, params, dst: (
+        cv2.bilateralFilter(
+            image_cv,
+            params.diameter,
+            params.sigma_color,
+            params.sigma_space,
+            dst=dst,
+        )
+    ),
+    NoiseReductionFilter.LAMBDA_FILTER.type: lambda image_cv, params, dst: (
+        params.func(image_cv)
+    ),
+}
+
+# filter types _reduce_noise_cuda can run
+_CUDA_FILTER_TYPES = frozenset(
+    {
+        NoiseReductionFilter.MEDIAN_FILTER.type,
+        NoiseReductionFilter.GAUSSIAN_BLUR.type,
+        NoiseReductionFilter.BILATERAL_FILTER.type,
+    }
+)
+
+
+def _free_buffer(
+    image_cv: np.ndarray, buffers: Optional[List[np.ndarray]]
+) -> Optional[np.ndarray]:
     """
-    Apply noise reduction techniques to an image.
+    @private
+    Pick a scratch array a filter of image_cv can write its result to.
 
-    Note that a RGB2BGR conversion is done before applying the filters.
+    :param image_cv: The filter input.
+    :param buffers: The scratch arrays, if any.
 
-    :param image: Pillow image to be processed.
-    :param filters_compose: List of NoiseReductionFilter
-           enums representing the filters to apply.
+    :return: A scratch array of the same shape and dtype that does not
+        overlap image_cv, or None to let OpenCV allocate the output.
+    """
 
-    :return: Processed Pillow image.
+    for buffer in buffers or ():
+        if (
+            buffer.shape == image_cv.shape
+            and buffer.dtype == image_cv.dtype
+            and not np.may_share_memory(buffer, image_cv)
+        ):
+            return buffer
+
+    return None
+
+
+@lru_cache(maxsize=None)
+def _cuda_available() -> bool:
     """
+    @private
+    Check whether OpenCV was built with CUDA and a device is present.
 
-    # Convert Pillow image to OpenCV format
-    image_cv = np.array(image)
-    image_cv = cv2.cvtColor(image_cv, cv2.COLOR_RGB2BGR)
+    :return: True if the cv2.cuda filters can be used.
+    """
 
-    if len(filters_compose) == 0:
-        return image
+    try:
+        return cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except (AttributeError, cv2.error):
+        return False
+
+
+def _cuda_disabled() -> bool:
+    """
+    @private
+    Check whether the RADSTRACT_DISABLE_CUDA environment variable turns
+    off every GPU path, the CUDA filters as well as GPU DICOM decoding.
+
+    :return: True if the variable is set to anything but "0".
+    """
+
+    return os.environ.get("RADSTRACT_DISABLE_CUDA", "0") != "0"
+
+
+def _use_cuda(
+    image_cv: np.ndarray, filters_compose: List[NoiseReductionFilter]
+) -> bool:
+    """
+    @private
+    Check whether a filter chain should run on the GPU. It needs a CUDA
+    device, a 3 channel 8-bit image, only filters _reduce_noise_cuda can
+    run, and RADSTRACT_DISABLE_CUDA to be unset or "0".
+
+    :param image_cv: The image the filters will be applied to.
+    :param filters_compose: List of NoiseReductionFilter.
+
+    :return: True if _reduce_noise_cuda should be used.
+    """
+
+    return (
+        not _cuda_disabled()
+        and image_cv.dtype == np.uint8
+        and image_cv.ndim == 3
+        and image_cv.shape[-1] == 3
+        and all(
+            fil_func.type in _CUDA_FILTER_TYPES for fil_func in filters_compose
+        )
+        and _cuda_available()
+    )
+
+
+def _reduce_noise_cuda(
+    image_cv: np.ndarray, filters_compose: List[NoiseReductionFilter]
+) -> np.ndarray:
+    """
+    @private
+    Apply median, gaussian and bilateral filters on the GPU, uploading
+    the image once and downloading it once for the whole chain.
+
+    Results can differ slightly from the CPU filters.
+
+    :param image_cv: 3 channel image, in either channel order.
+    :param filters_compose: List of NoiseReductionFilter, none of which
+           may be a LAMBDA_FILTER.
+
+    :return: Processed image, in the same channel order.
+    """
+
+    gpu_image = cv2.cuda_GpuMat()
+    # 4 channels are supported by every CUDA filter, 3 are not
+    gpu_image.upload(cv2.cvtColor(image_cv, cv2.COLOR_BGR2BGRA))
 
     for fil_func in filters_compose:
         if fil_func.type == NoiseReductionFilter.MEDIAN_FILTER.type:
-            image_cv = cv2.medianBlur(image_cv, fil_func.size)
+            # The CUDA median filter only supports single channel images
+            median = cv2.cuda.createMedianFilter(cv2.CV_8UC1, fil_func.size)
+            gpu_image = cv2.cuda.merge(
+                [median.apply(c) for c in cv2.cuda.split(gpu_image)]
+            )
         elif fil_func.type == NoiseReductionFilter.GAUSSIAN_BLUR.type:
-            image_cv = cv2.GaussianBlur(image_cv, fil_func.kernel_size, 0)
+            gaussian = cv2.cuda.createGaussianFilter(
+                gpu_image.type(), -1, fil_func.kernel_size, 0
+            )
+            gpu_image = gaussian.apply(gpu_image)
         elif fil_func.type == NoiseReductionFilter.BILATERAL_FILTER.type:
-            diameter, sigma_color, sigma_space = (
+            gpu_image = cv2.cuda.bilateralFilter(
+                gpu_image,
                 fil_func.diameter,
                 fil_func.sigma_color,
                 fil_func.sigma_space,
             )
-            image_cv = cv2.bilateralFilter(
-                image_cv,
-                diameter,
-                sigma_color,
-                sigma_space,
-            )
-        elif fil_func.type == NoiseReductionFilter.LAMBDA_FILTER.type:
-            image_cv = fil_func.func(image_cv)
-        else:
+
+    return cv2.cvtColor(gpu_image.download(), cv2.COLOR_BGRA2BGR)
+
+
+def _apply_filters(
+    image_cv: np.ndarray,
+    filters_compose: List[NoiseReductionFilter],
+    buffers: Optional[List[np.ndarray]] = None,
+) -> Optional[np.ndarray]:
+    """
+    @private
+    Apply a chain of filters to an image array.
+
+    :param image_cv: The image, in RGB order. It is not modified.
+    :param filters_compose: List of NoiseReductionFilter.
+    :param buffers: Scratch arrays shaped like image_cv the OpenCV filters
+        write their output to, or None to allocate every output.
+
+    :return: The processed image in RGB order, which may be one of the
+        buffers, or None if no filter was applied.
+    """
+
+    if _use_cuda(image_cv, filters_compose):
+        return _reduce_noise_cuda(image_cv, filters_compose)
+
+    # The built-in filters treat every channel alike, so the image only
+    # goes to BGR for LAMBDA_FILTER functions, which are promised BGR.
+    is_bgr = False
+
+    # stays False if every filter was of an unknown type
+    modified = False
+
+    for fil_func in filters_compose:
+        apply_filter = _FILTER_DISPATCH.get(fil_func.type)
+
+        if apply_filter is None:
             warnings.warn(f"Unknown filter type: {fil_func.type}")
+            continue
+
+        if fil_func.type == NoiseReductionFilter.LAMBDA_FILTER.type:
+            if not is_bgr:
+                image_cv = cv2.cvtColor(image_cv, cv2.COLOR_RGB2BGR)
+                is_bgr = True
+            elif any(
+                np.may_share_memory(image_cv, buffer)
+                for buffer in buffers or ()
+            ):
+                # LAMBDA_FILTER functions may keep their input, so they
+                # are never handed a scratch array
+                image_cv = image_cv.copy()
+
+        image_cv = apply_filter(
+            image_cv, fil_func, _free_buffer(image_cv, buffers)
+        )
+        modified = True
+
+    if not modified:
+        return None
+
+    if is_bgr:
+        image_cv = cv2.cvtColor(image_cv, cv2.COLOR_BGR2RGB)
+
+    return image_cv
+
+
+def reduce_noise(
+    image: Image.Image, filters_compose: List[NoiseReductionFilter] = []
+) -> Image.Image:
+    """
+    Apply noise reduction techniques to an image.
+
+    Note that LAMBDA_FILTER functions receive the image in BGR order.
+
+    If OpenCV has CUDA support and a device is available, chains without
+    a LAMBDA_FILTER run on the GPU for 3 channel images. Set the
+    RADSTRACT_DISABLE_CUDA environment variable to 1 to always use the
+    CPU, whose results can differ slightly.
+
+    To filter many images of the same size, NoiseReducer reuses its
+    memory between them.
+
+    :param image: Pillow image to be processed.
+    :param filters_compose: List of NoiseReductionFilter
+           enums representing the filters to apply.
+
+    :return: Processed Pillow image.
+    """
+
+    # Nothing to apply, so skip the conversions to and from OpenCV
+    if len(filters_compose) == 0:
+        return image
+
+    image_cv = _apply_filters(np.asarray(image), filters_compose)
+
+    if image_cv is None:
+        return image
 
     # Convert back to Pillow format
-    processed_image = Image.fromarray(
-        cv2.cvtColor(image_cv, cv2.COLOR_BGR2RGB)
-    )
+    return Image.fromarray(image_cv)
+
+
+class NoiseReducer:
+    """
+    Apply a chain of noise filters to many images of the same size, such
+    as the frames of a series.
+
+    The OpenCV filters write their output into two arrays the reducer
+    owns and reuses for every image, instead of allocating new ones for
+    every filter and image. A reducer must therefore not be shared
+    between threads. LAMBDA_FILTER functions still receive arrays of
+    their own, in BGR order.
+
+    :param filters_compose: List of NoiseReductionFilter
+           enums representing the filters to apply.
+    """
+
+    def __init__(self, filters_compose: List[NoiseReductionFilter]):
+        self.filters_compose = list(filters_compose)
+        self._buffers = None
+
+    def _scratch_buffers(self, image_cv: np.ndarray) -> List[np.ndarray]:
+        """
+        @private
+        Get the two scratch arrays, reallocated if image_cv has another
+        shape or dtype than the previous image.
+
+        :param image_cv: The image the filters will be applied to.
+
+        :return: The two scratch arrays.
+        """
+
+        if (
+            self._buffers is None
+            or self._buffers[0].shape != image_cv.shape
+            or self._buffers[0].dtype != image_cv.dtype
+        ):
+            self._buffers = [np.empty_like(image_cv), np.empty_like(image_cv)]
+
+        return self._buffers
+
+    def apply_array(self, image_cv: np.ndarray) -> np.ndarray:
+        """
+        Apply the filters to an image array.
+
+        :param image_cv: The image, in RGB order. It is not modified.
+
+        :return: The processed image, in RGB order, or image_cv itself if
+            no filter applied. It may be one of the reducer's arrays, which
+            the next call overwrites, so copy it to keep it.
+        """
+
+        if not self.filters_compose:
+            return image_cv
+
+        result = _apply_filters(
+            image_cv, self.filters_compose, self._scratch_buffers(image_cv)
+        )
+
+        return image_cv if result is None else result
+
+    def reduce(self, image: Image.Image) -> Image.Image:
+        """
+        Apply the filters to a Pillow image.
+
+        :param image: Pillow image to be processed.
+
+        :return: Processed Pillow image, which later calls do not change.
+        """
+
+        image_cv = np.asarray(image)
+        result = self.apply_array(image_cv)
+
+        if result is image_cv:
+            return image
+
+        # Pillow may wrap the array without copying it, so a result still
+        # in the reducer's arrays is copied out first
+        if any(
+            np.may_share_memory(result, buffer) for buffer in self._buffers
+        ):
+            result = result.copy()
 
-    return processed_image
+        return Image.fromarray(result)
@@ -18,7 +18,7 @@ Crop and Resize Utility Functions for Images.
 Used by the DICOM and NIFTI data importers.
 """
 
-from typing import Tuple
+from typing import List, Tuple
 
 import numpy as np
 from PIL import Image
@@ -38,9 +38,14 @@ def crop_and_resize(
     :param compress_factor: Factor to compress the cropped images.
     :param for_label: Boolean to indicate if the image is a label.
 
-    :return: cropped and resized PIL image.
+    :return: cropped and resized PIL image, or img itself when there is
+        nothing to crop or resize.
     """
 
+    # Without a crop, compress_factor only applies to labels
+    if not crop_coordinates and (compress_factor == 1 or not for_label):
+        return img
+
     if crop_coordinates:
         x, y, width, height = crop_coordinates
 
@@ -59,10 +64,12 @@ def crop_and_resize(
     # To Handle
     # https://stackoverflow.com/questions/31300865/srgb-aware-image-resize-in-pillow/31359054
     if for_label:
-        # Initialize compressed image
-        resized_image = np.zeros((new_height, new_width, 3))
+        # Keep every compress_factor-th pixel, so no new colours appear.
+        # PIL's NEAREST resize samples other pixels, so it is not used.
+        if compress_factor == 1:
+            return cropped_image
 
-        image_array = np.array(cropped_image)
+        image_array = np.asarray(cropped_image)
 
         # Apply compression
         resized_image = image_array[::compress_factor, ::compress_factor]
@@ -70,7 +77,36 @@ def crop_and_resize(
         # Convert to PIL image
         resized_image = Image.fromarray(resized_image, "RGB")
 
+    elif cropped_image.size == (new_width, new_height):
+        resized_image = cropped_image
+
     else:
         resized_image = cropped_image.resize((new_width, new_height))
 
     return resized_image
+
+
+def stack_images(images: List[Image.Image]) -> np.ndarray:
+    """
+    Stack images into one (N, H, W[, C]) array.
+
+    Each image is copied straight into a preallocated array, rather than
+    converting them all to arrays and then stacking those.
+
+    :param images: List of PIL images (or arrays) of the same size and mode.
+
+    :return: The stacked images.
+
+    :raises ValueError: If images is empty.
+    """
+
+    if len(images) == 0:
+        raise ValueError("images cannot be empty")
+
+    first_image = np.asarray(images[0])
+    stack = np.empty((len(images),) + first_image.shape, first_image.dtype)
+    stack[0] = first_image
+    for index, image in enumerate(images[1:], start=1):
+        stack[index] = np.asarray(image)
+
+    return stack
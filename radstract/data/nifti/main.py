@@ -20,7 +20,8 @@ Examples:
 - https://github.com/radoss-org/Radstract/tree/main/examples/data/nifti_import.py
 """
 
-from typing import List, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple, Union
 
 import nibabel as nib
 import numpy as np
@@ -28,11 +29,7 @@ import SimpleITK as sitk
 from nibabel.nifti1 import Nifti1Image
 from PIL import Image
 
-from radstract.data.colors import (
-    LabelColours,
-    convert_labels_to_image,
-    get_unique_colours,
-)
+from radstract.data.colors import LabelColours, _pack_rgb
 from radstract.data.images import crop_and_resize
 
 
@@ -77,11 +74,67 @@ class NIFTI:
             raise ValueError(f"Unknown NIfTI type {self.type}")
 
 
+def _crop_nifti(
+    nii: Nifti1Image, crop_coordinates: Tuple[int, int, int, int] = None
+) -> Tuple[Nifti1Image, Tuple[int, int, int, int]]:
+    """
+    @private
+    Crop a NIfTI image at the I/O layer, so voxels outside the crop are
+    never read (uncompressed files are memory-mapped).
+
+    Image (x, y) maps to voxel (x, y) as the slices are transposed on the
+    way out. Crops that extend past the volume are left to crop_and_resize,
+    which zero-pads them.
+
+    :param nii: NIfTI object.
+    :param crop_coordinates: The crop coordinates (x, y, width, height).
+
+    :return: The (lazily) cropped NIfTI object and the crop coordinates
+    still to be applied to its images.
+    """
+
+    if not crop_coordinates:
+        return nii, crop_coordinates
+
+    x, y, width, height = crop_coordinates
+
+    if x < 0 or y < 0 or x + width > nii.shape[0] or y + height > nii.shape[1]:
+        return nii, crop_coordinates
+
+    return nii.slicer[x : x + width, y : y + height], (0, 0, width, height)
+
+
+def _map_slices(
+    process_slice: Callable[[np.ndarray], Image.Image],
+    volume: np.ndarray,
+    threads: int,
+) -> List[Image.Image]:
+    """
+    @private
+    Convert every slice along the first axis of a volume, in order.
+
+    :param process_slice: Function converting one slice to an image.
+    :param volume: The volume to convert, slices first.
+    :param threads: Number of threads to convert the slices with.
+
+    :return: The list of images.
+    """
+
+    if threads == 1:
+        return [process_slice(slice_data) for slice_data in volume]
+
+    # The array copies and PIL resampling release the GIL, so slices
+    # convert concurrently
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(process_slice, volume))
+
+
 # Function to process NIfTI files
 def convert_nifti_to_image_labels(
     nii: Union[str, Nifti1Image],
     crop_coordinates: Tuple[int, int, int, int] = None,
     compress_factor: int = 1,
+    threads: int = 1,
 ) -> Tuple[List[Image.Image], np.ndarray]:
     """
     Process a NIfTI file to extract each frame and convert to JPEG images
@@ -93,6 +146,7 @@ def convert_nifti_to_image_labels(
     :param nii: Either a NIfTI file path or a NIfTI object.
     :param crop_coordinates: The crop coordinates for the images.
     :param compress_factor: The compression factor for the images.
+    :param threads: Number of threads to convert the slices with.
 
     :return: A tuple of the list of JPEG images and the affine matrix.
     """
@@ -100,26 +154,30 @@ def convert_nifti_to_image_labels(
     if isinstance(nii, str):
         nii = nib.load(nii)
 
-    data = nii.get_fdata()
-    images = []
+    cropped, crop_coordinates = _crop_nifti(nii, crop_coordinates)
+
+    # dataobj keeps the on-disk integer dtype (and is memory-mapped for
+    # uncompressed files), where get_fdata() would upcast to float64
+    data = np.asanyarray(cropped.dataobj)
 
-    for i in range(data.shape[2]):
-        slice_data = data[:, :, i]
-        slice_data = np.rot90(slice_data)  # rotate 90 degrees clockwise
-        slice_data = np.flipud(slice_data)  # flip vertically
+    if not np.issubdtype(data.dtype, np.integer):
+        data = data.astype(np.intp)
 
-        color_mapped_slice = convert_labels_to_image(slice_data)
+    # Colour the whole volume with a single palette lookup. Rotating each
+    # slice 90 degrees clockwise and flipping it vertically is a transpose,
+    # so indexing with the (N, Y, X) view yields contiguous image slices
+    palette = LabelColours.get_palette(int(data.max(initial=0)) + 1)
+    rgb_volume = palette[data.transpose(2, 1, 0)]
 
-        img = Image.fromarray((color_mapped_slice).astype("uint8"), "RGB")
+    def process_slice(slice_data: np.ndarray) -> Image.Image:
+        img = Image.fromarray(slice_data, "RGB")
 
         # Apply crop and resize
-        img = crop_and_resize(
+        return crop_and_resize(
             img, crop_coordinates, compress_factor, for_label=True
         )
 
-        images.append(img)
-
-    return images, nii.affine
+    return _map_slices(process_slice, rgb_volume, threads), nii.affine
 
 
 def convert_images_to_nifti_labels(images: List[Image.Image]) -> NIFTI:
@@ -129,33 +187,38 @@ def convert_images_to_nifti_labels(images: List[Image.Image]) -> NIFTI:
     :param images: List of PIL images.
 
     :return: NIfTI object.
+
+    :raises ValueError: If an image holds a colour that is not a label colour.
     """
 
-    final_data = np.zeros(
-        (images[0].height, images[0].width, len(images)), dtype=np.uint16
+    final_data = np.empty(
+        (len(images), images[0].height, images[0].width), dtype=np.uint16
     )
 
     for i, image in enumerate(images):
-        img_array = np.array(image, dtype=np.uint16)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
 
-        for unique_colour in get_unique_colours(img=image):
-            # Find the coordinates of the pixels that match the unique colour.
-            label_key = LabelColours.get_colour_key(unique_colour)
-            mask = np.all(img_array == unique_colour, axis=2)
-            final_data[:, :, i][mask] = label_key
+        final_data[i] = LabelColours.get_colour_keys(
+            _pack_rgb(np.asarray(image))
+        )
 
-    # Moving back to RAI orientation
+    # Moving back to RAI orientation: rotating each (H, W) slice 90 degrees
+    # clockwise and flipping it vertically is a transpose, done once here
+    final_data = final_data.transpose(2, 1, 0)
 
-    # rotate 90 degrees clockwise
-    final_data = np.rot90(final_data)
-    # flip vertically
-    final_data = np.flipud(final_data)
+    # Store as uint8 when every label fits, halving the file size
+    if final_data.max(initial=0) <= np.iinfo(np.uint8).max:
+        final_data = final_data.astype(np.uint8)
 
     # RAI affine (apparently)
     # https://chat.openai.com/c/45d4627e-4b69-44fc-b68f-1d5ab90111dc
     affine = np.diag([-1, -1, 1, 1])
 
     image = nib.Nifti1Image(final_data, affine=affine)
+    image.header.set_data_dtype(final_data.dtype)
+    # unit scaling, so readers get integer labels back rather than floats
+    image.header.set_slope_inter(1, 0)
 
     return NIFTI(image, type=NIFTI_Types.NIBABEL)
 
@@ -164,17 +227,21 @@ def convert_nifti_to_images(
     nii: Union[str, Nifti1Image],
     crop_coordinates: Tuple[int, int, int, int] = None,
     compress_factor: int = 1,
+    threads: int = 1,
 ) -> Tuple[List[Image.Image], np.ndarray]:
     """
     Process a NIfTI file to extract each frame and convert to JPEG images.
 
-    Currently assumes RAI Orientation.
+    Currently assumes RAI Orientation. Both RGB volumes, with a singleton
+    4th dimension, and 3D grayscale volumes are supported, the latter also
+    returned as RGB images.
 
     For label-based NIfTI files, use convert_nifti_to_image_labels.
 
     :param nii: Either a NIfTI file path or a NIfTI object.
     :param crop_coordinates: The crop coordinates for the images.
     :param compress_factor: The compression factor for the images.
+    :param threads: Number of threads to convert the slices with.
 
     :return: The list of JPEG images.
     """
@@ -182,23 +249,33 @@ def convert_nifti_to_images(
     if isinstance(nii, str):
         nii = nib.load(nii)
 
-    data = nii.get_fdata()
-    images = []
+    cropped, crop_coordinates = _crop_nifti(nii, crop_coordinates)
+
+    # dataobj keeps the stored dtype (uint8 for RGB volumes), where
+    # get_fdata() would first expand the whole volume to float64
+    data = np.asanyarray(cropped.dataobj)
 
-    for i in range(data.shape[2]):
-        slice_data = data[:, :, i, :]
-        # remove the 3rd dimension
-        slice_data = np.squeeze(slice_data, axis=2)
-        slice_data = np.rot90(slice_data)  # rotate 90 degrees clockwise
-        slice_data = np.flipud(slice_data)  # flip vertically
+    # remove the singleton 4th dimension, then rotate 90 degrees clockwise
+    # and flip vertically as one transpose view over the whole volume.
+    # Grayscale volumes are kept at one byte per voxel until each slice
+    # becomes an image
+    grayscale = data.ndim == 3
+    if grayscale:
+        volume = data.transpose(2, 1, 0)
+    else:
+        volume = np.squeeze(data, axis=3).transpose(2, 1, 0, 3)
 
-        img = Image.fromarray((slice_data).astype("uint8"), "RGB")
+    def process_slice(slice_data: np.ndarray) -> Image.Image:
+        slice_data = slice_data.astype("uint8", order="C")
+
+        if grayscale:
+            img = Image.fromarray(slice_data, "L").convert("RGB")
+        else:
+            img = Image.fromarray(slice_data, "RGB")
 
         # Apply crop and resize
-        img = crop_and_resize(
+        return crop_and_resize(
             img, crop_coordinates, compress_factor, for_label=True
         )
 
-        images.append(img)
-
-    return images, nii.affine
+    return _map_slices(process_slice, volume, threads), nii.affine
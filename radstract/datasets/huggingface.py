@@ -86,25 +86,47 @@ def make_huggingface_datadict(
     :return: DatasetDict: Huggingface DatasetDict.
     """
 
+    def find_files(directory, extension):
+        # scandir entries carry their type and full path, so no stat or
+        # path join is needed per file
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from find_files(entry.path, extension)
+                elif entry.is_file() and entry.name.endswith(extension):
+                    yield entry.path
+
     def get_dataset_paths(data_type, file_type, extension):
-        paths = []
         data_path = os.path.join(dataset_dir, file_type, data_type)
-        for root, _, files in os.walk(data_path):
-            for file in files:
-                if file.endswith(extension):
-                    paths.append(os.path.join(root, file))
-        # Shuffle and select a fraction of the dataset
-        random.shuffle(paths)
-        return paths[: int(len(paths) * dataset_fraction)]
-
-    image_paths_train = get_dataset_paths("train", "images", ".jpg")
-    label_paths_train = get_dataset_paths("train", "labels", ".png")
-    image_paths_validation = get_dataset_paths("val", "images", ".jpg")
-    label_paths_validation = get_dataset_paths("val", "labels", ".png")
-
-    def create_dataset(image_paths, label_paths):
+        # a split with no files of this type may have no folder at all
+        if not os.path.isdir(data_path):
+            return []
+        return sorted(find_files(data_path, extension))
+
+    def create_dataset(data_type):
+        image_paths = get_dataset_paths(data_type, "images", ".jpg")
+        label_paths = get_dataset_paths(data_type, "labels", ".png")
+
+        if len(image_paths) != len(label_paths):
+            raise ValueError(
+                f"Found {len(image_paths)} images but {len(label_paths)} "
+                f"labels in the {data_type} split."
+            )
+
+        # Images and labels pair up by sorted position, so the same
+        # positions are selected from both lists
+        if dataset_fraction < 1:
+            selected = sorted(
+                random.sample(
+                    range(len(image_paths)),
+                    int(len(image_paths) * dataset_fraction),
+                )
+            )
+            image_paths = [image_paths[i] for i in selected]
+            label_paths = [label_paths[i] for i in selected]
+
         dataset_test = Dataset.from_dict(
-            {"image": sorted(image_paths), "label": sorted(label_paths)}
+            {"image": image_paths, "label": label_paths}
         )
         dataset_test = dataset_test.cast_column("image", HuggingfaceImage())
         dataset_test = dataset_test.cast_column("label", HuggingfaceImage())
@@ -112,10 +134,8 @@ def make_huggingface_datadict(
         return dataset_test
 
     # step 1: create Dataset objects
-    train_dataset = create_dataset(image_paths_train, label_paths_train)
-    validation_dataset = create_dataset(
-        image_paths_validation, label_paths_validation
-    )
+    train_dataset = create_dataset("train")
+    validation_dataset = create_dataset("val")
 
     # step 2: create DatasetDict
     dataset = DatasetDict(
@@ -20,10 +20,10 @@ import os
 import random
 from typing import Dict, List, Optional, Tuple, Union
 
-import numpy as np
 import SimpleITK as sitk
 
 from radstract.data.dicom import DicomTypes
+from radstract.data.images import stack_images
 from radstract.data.nifti import NIFTI, convert_images_to_nifti_labels
 
 from .utils import DataSplit, convert_dcm_nii_dataset
@@ -80,7 +80,7 @@ def save_nunnet(
         root_output_dir, image_dir, label_dir
     )
 
-    nifti_image = NIFTI(sitk.GetImageFromArray(np.array(images)))
+    nifti_image = NIFTI(sitk.GetImageFromArray(stack_images(images)))
     nifti_label = convert_images_to_nifti_labels(image_labels)
 
     nifti_image.save(os.path.join(nii_dir, f"{file_name}.nii.gz"))
@@ -160,6 +160,10 @@ def generate_nnunet_dataset_json(
     :return: Dictionary containing the dataset.json
     """
 
+    # List each folder once, everything below is derived from these
+    training_images = sorted(os.listdir(nnunet_dir_structure["imagesTr"]))
+    test_images = sorted(os.listdir(nnunet_dir_structure["imagesTs"]))
+
     json_dict = {
         "name": dataset_name,
         "description": description,
@@ -169,27 +173,24 @@ def generate_nnunet_dataset_json(
         "release": release,
         "modality": modalities,
         "labels": labels,
-        "numTest": len(os.listdir(nnunet_dir_structure["imagesTs"])),
-        "numTraining": len(os.listdir(nnunet_dir_structure["imagesTr"])),
+        "numTest": len(test_images),
+        "numTraining": len(training_images),
         "training": [
             {
                 "image": f"./imagesTr/{i}",
                 "label": f"./labelsTr/{i}",
             }
-            for i in sorted(os.listdir(nnunet_dir_structure["imagesTr"]))
+            for i in training_images
         ],
         "test": [
             {
                 "image": f"./imagesTs/{i}",
                 "label": f"./labelsTr/{i}",
             }
-            for i in sorted(os.listdir(nnunet_dir_structure["imagesTs"]))
+            for i in test_images
         ],
     }
 
-    # Update numTest according to the actual test cases
-    json_dict["numTest"] = len(os.listdir(nnunet_dir_structure["imagesTs"]))
-
     return json_dict
 
 
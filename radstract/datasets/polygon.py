@@ -99,17 +99,12 @@ def save_polygons(
 
     min_polygons = file_pair_kwargs.get("min_polygons", 6)
 
-    temp_dict = segmentation_to_polygons(seg_image)
-    polygons = {}
-
-    for key in temp_dict.keys():
-        polygons[key - 1] = temp_dict[key]
-
-    # remove any polygons with less than 6 points
-    for key, value in polygons.items():
-        polygons[key] = [
-            polygon for polygon in value if len(polygon) >= min_polygons
-        ]
+    # shift the colour keys to 0-based classes, and remove any polygons
+    # with less than min_polygons points
+    polygons = {
+        key - 1: [polygon for polygon in value if len(polygon) >= min_polygons]
+        for key, value in segmentation_to_polygons(seg_image).items()
+    }
 
     lines = get_polygon_annotations(polygons, image_shape=dicom_image.size)
     if lines:
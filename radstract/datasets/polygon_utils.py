@@ -19,7 +19,7 @@ import cv2
 import numpy as np
 from PIL import Image
 
-from radstract.data.colors import LabelColours, get_unique_colours
+from radstract.data.colors import LabelColours, _pack_rgb
 
 
 def segmentation_to_polygons(
@@ -31,37 +31,51 @@ def segmentation_to_polygons(
     :param seg_image: PIL Image: Segmentation mask image.
 
     :return: dict: Dictionary of polygons for each class.
+
+    :raises ValueError: If the mask is not an (H, W, 3) RGB array.
     """
-    # Load segmentation mask
-    mask = np.array(seg_image)
+    # Palette, greyscale and RGBA masks are matched on their RGB colours
+    if isinstance(seg_image, Image.Image) and seg_image.mode != "RGB":
+        seg_image = seg_image.convert("RGB")
+
+    seg_array = np.asarray(seg_image)
+    if seg_array.ndim != 3 or seg_array.shape[2] != 3:
+        raise ValueError(
+            f"Expected an (H, W, 3) RGB mask, got shape {seg_array.shape}"
+        )
 
-    polygons = {}
+    # Load segmentation mask, one packed key per pixel
+    keys = _pack_rgb(seg_array)
 
-    for mask_colour in get_unique_colours(array=mask):
-        if mask_colour == (0, 0, 0):
-            continue
+    polygons = {}
 
-        color_mask = np.all(mask == mask_colour, axis=-1)
+    # Sorted keys give the same colour order as sorted RGB tuples
+    unique_keys = np.unique(keys)
+    colour_keys = LabelColours.get_colour_keys(unique_keys)
 
-        segment_mask = np.zeros_like(mask)
-        segment_mask[color_mask] = 255
+    for key, colour_key in zip(unique_keys.tolist(), colour_keys.tolist()):
+        if key == 0:
+            continue
 
-        # convert to grayscale
-        segment_mask = cv2.cvtColor(segment_mask, cv2.COLOR_BGR2GRAY)
+        # findContours treats any non-zero pixel as foreground, so the
+        # boolean mask can be passed as 0/1 bytes without a copy
+        segment_mask = (keys == key).view(np.uint8)
 
         # Find contours of the segment
         contours, _ = cv2.findContours(
             segment_mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE
         )
 
+        if not contours:
+            continue
+
+        colour_polygons = polygons.setdefault(colour_key, [])
+
         # Approximate contours to polygons and add them to the list
         for contour in contours:
             epsilon = 0.01 * cv2.arcLength(contour, True)
             approx = cv2.approxPolyDP(contour, epsilon, True)
-            polygon = approx.squeeze().tolist()
-
-            key = LabelColours.get_colour_key(mask_colour)
-            polygons.setdefault(key, []).append(polygon)
+            colour_polygons.append(approx.squeeze().tolist())
 
     return polygons
 
@@ -85,13 +99,17 @@ def get_polygon_annotations(
         for colour_key in polygons.keys():
             for polygon in polygons[colour_key]:
                 # Normalize the polygon coordinates (0 to 1 scale) based on the image dimensions
-                normalized_polygon = [
-                    (x / width, y / height) for x, y in polygon
+                coordinates = [
+                    value
+                    for x, y in polygon
+                    for value in (x / width, y / height)
                 ]
 
+                # One %-format call for the whole line rather than an
+                # f-string per point
                 line = f"{colour_key} " + " ".join(
-                    f"{x:.6f} {y:.6f}" for x, y in normalized_polygon
-                )
+                    ["%.6f"] * len(coordinates)
+                ) % tuple(coordinates)
 
                 lines.append(line)
 
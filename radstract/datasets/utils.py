@@ -272,24 +272,33 @@ def convert_dcm_nii_dataset(
     for pair in test_pairs:
         split_mapping.append(("test", pair))
 
-    # Use multiprocessing to process file pairs
-    with Pool(processes=processes) as pool:
-        pool.starmap(
-            _process_file_pair_with_split,
-            [
-                (
-                    input_dir,
-                    output_dir,
-                    crop_coordinates,
-                    dicom_type,
-                    pair_key,
-                    pair,
-                    split,
-                    color_changes,
-                    file_pair_kwargs,
-                    save_func,
-                    single_image_process,
-                )
-                for split, (pair_key, pair) in split_mapping
-            ],
+    tasks = [
+        (
+            input_dir,
+            output_dir,
+            crop_coordinates,
+            dicom_type,
+            pair_key,
+            pair,
+            split,
+            color_changes,
+            file_pair_kwargs,
+            save_func,
+            single_image_process,
         )
+        for split, (pair_key, pair) in split_mapping
+    ]
+
+    # Workers only receive file paths and decode the volumes themselves,
+    # so a single process is run inline rather than paying for a Pool
+    if processes == 1:
+        for task in tasks:
+            _process_file_pair_with_split(*task)
+        return
+
+    # Use multiprocessing to process file pairs. Each pair is a whole
+    # volume of very uneven length, so they are handed out one at a time
+    # rather than in pre-cut chunks that can leave one worker with the
+    # longest scans while the rest sit idle
+    with Pool(processes=processes) as pool:
+        pool.starmap(_process_file_pair_with_split, tasks, chunksize=1)
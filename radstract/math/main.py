@@ -20,6 +20,8 @@ Examples: https://github.com/radoss-org/Radstract/tree/main/examples/math/smart_
 
 from typing import Tuple
 
+import numpy as np
+
 # create coordinate type
 Coordinate = Tuple[int, int]
 
@@ -60,3 +62,53 @@ def smart_find_intersection(
     y = -((x1 * y2 - y1 * x2) * dy2 - (x3 * y4 - y3 * x4) * dy1) / determinant
 
     return int(x), int(y)
+
+
+def smart_find_intersection_batch(
+    points1a: np.ndarray,
+    points1b: np.ndarray,
+    points2a: np.ndarray,
+    points2b: np.ndarray,
+) -> np.ndarray:
+    """
+    Vectorised smart_find_intersection over N pairs of lines.
+
+    Line1[i]: points1a[i], points1b[i]
+    Line2[i]: points2a[i], points2b[i]
+
+    :param points1a: (N, 2) array of first points on the first lines.
+    :param points1b: (N, 2) array of second points on the first lines.
+    :param points2a: (N, 2) array of first points on the second lines.
+    :param points2b: (N, 2) array of second points on the second lines.
+
+    :return: (N, 2) integer array of intersection points.
+
+    :raises ValueError: If any pair of lines is parallel.
+    """
+    x1, y1 = np.asarray(points1a, dtype=np.float64).T
+    x2, y2 = np.asarray(points1b, dtype=np.float64).T
+    x3, y3 = np.asarray(points2a, dtype=np.float64).T
+    x4, y4 = np.asarray(points2b, dtype=np.float64).T
+
+    # Calculate the differences
+    dx1 = x2 - x1
+    dy1 = y2 - y1
+    dx2 = x4 - x3
+    dy2 = y4 - y3
+
+    # Calculate the determinant
+    determinant = dx1 * dy2 - dy1 * dx2
+
+    if not determinant.all():
+        raise ValueError(
+            f"Lines are parallel at indices {np.flatnonzero(determinant == 0)}"
+        )
+
+    # Calculate the intersection points
+    cross1 = x1 * y2 - y1 * x2
+    cross2 = x3 * y4 - y3 * x4
+    x = -(cross1 * dx2 - cross2 * dx1) / determinant
+    y = -(cross1 * dy2 - cross2 * dy1) / determinant
+
+    # truncate towards zero, as int() does in smart_find_intersection
+    return np.stack([x, y], axis=-1).astype(int)
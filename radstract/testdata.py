@@ -91,8 +91,7 @@ def download_case(
         directory = f"/tmp/radstract-testdata/{uuid.uuid4()}"
 
     # Ensure the directory exists
-    if not os.path.exists(directory):
-        os.makedirs(directory)
+    os.makedirs(directory, exist_ok=True)
 
     filenames = []
 
@@ -65,8 +65,7 @@ def create_datasets():
     OUTPUT_DIR = "./tests/test_data/post_created_datasets"
 
     # create output dir
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
 
     polygon_dir = os.path.join(OUTPUT_DIR, "polygon")
     huggingface_dir = os.path.join(OUTPUT_DIR, "huggingface")
@@ -43,6 +43,24 @@ def test_calculate_a3(sample_trimesh):
     assert np.all(angles <= 180)
 
 
+def test_calculate_a3_numba_kernel(sample_trimesh, monkeypatch):
+    pytest.importorskip("numba")
+    from radstract.analysis.shapedistro.models import a3
+
+    fused = calculate_a3(sample_trimesh)
+    monkeypatch.setattr(a3, "_a3_kernel", None)
+
+    assert np.allclose(fused, calculate_a3(sample_trimesh))
+
+
+def test_calculate_a3_seed(sample_trimesh):
+    assert np.array_equal(
+        calculate_a3(sample_trimesh, seed=7),
+        calculate_a3(sample_trimesh, seed=7),
+    )
+    assert len(calculate_a3(sample_trimesh, seed=None)) == 1000
+
+
 def test_calculate_d2(sample_trimesh):
     distances = calculate_d2(sample_trimesh)
     assert isinstance(distances, np.ndarray)
@@ -70,6 +88,19 @@ def test_generate_distribution(sample_trimesh):
         assert np.allclose(hist, npzfile["hist"])
 
 
+def test_generate_distribution_fast_histogram(sample_trimesh, monkeypatch):
+    pytest.importorskip("fast_histogram")
+    from radstract.analysis.shapedistro.models import common
+
+    for model in ShapeDistroModels.ALL:
+        _, fast = generate_distribution(sample_trimesh, model)
+        monkeypatch.setattr(common, "histogram1d", None)
+        _, fallback = generate_distribution(sample_trimesh, model)
+        monkeypatch.undo()
+
+        assert np.allclose(fast, fallback)
+
+
 def test_invalid_model(sample_trimesh):
     with pytest.raises(ValueError):
         generate_distribution(sample_trimesh, model="invalid")
@@ -14,8 +14,10 @@
 
 import os
 
+import nibabel as nib
 import numpy as np
 
+from radstract.analysis.shapedistro import plots
 from radstract.analysis.shapedistro.models import ShapeDistroModels
 from radstract.analysis.shapedistro.plots import (
     calculate_average,
@@ -52,6 +54,77 @@ def test_calculate_average(ultrasound_nifti_labels):
     assert isinstance(average_hist, np.ndarray)
 
 
+def test_calculate_average_cache(
+    ultrasound_nifti_labels, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(plots, "CACHE_DIR", str(tmp_path))
+
+    niftis = [ultrasound_nifti_labels, ultrasound_nifti_labels]
+    model = ShapeDistroModels.A3
+
+    uncached = calculate_average(niftis, model)
+    first = calculate_average(niftis, model, cache=True)
+    second = calculate_average(niftis, model, cache=True)
+
+    # both files are identical, so only one cache entry is written
+    assert len(os.listdir(tmp_path)) == 1
+    for result in (first, second):
+        for expected, value in zip(uncached, result):
+            assert np.array_equal(expected, value)
+
+
+def test_calculate_average_memoised(tmp_path, monkeypatch):
+    x, y, z = np.mgrid[:24, :24, :24]
+    sphere = ((x - 12) ** 2 + (y - 12) ** 2 + (z - 12) ** 2 < 64).astype(
+        np.uint8
+    )
+    nifti = str(tmp_path / "sphere.nii.gz")
+    nib.save(nib.Nifti1Image(sphere, np.eye(4)), nifti)
+
+    calls = []
+    create_model = plots.create_model_from_nifti
+
+    def counting_create_model(path):
+        calls.append(path)
+        return create_model(path)
+
+    monkeypatch.setattr(
+        plots, "create_model_from_nifti", counting_create_model
+    )
+    plots._memoised_distribution.cache_clear()
+
+    first = calculate_average([nifti, nifti], ShapeDistroModels.D2)
+    second = calculate_average([nifti], ShapeDistroModels.D2)
+
+    # the file is only meshed once across both calls
+    assert calls == [nifti]
+    assert np.array_equal(first[0], second[0])
+
+    plots._memoised_distribution.cache_clear()
+
+
+def test_get_plot_data_writable(tmp_path, monkeypatch):
+    x, y, z = np.mgrid[:24, :24, :24]
+    sphere = ((x - 12) ** 2 + (y - 12) ** 2 + (z - 12) ** 2 < 64).astype(
+        np.uint8
+    )
+    nifti = str(tmp_path / "sphere.nii.gz")
+    nib.save(nib.Nifti1Image(sphere, np.eye(4)), nifti)
+
+    monkeypatch.setattr(plots, "CACHE_DIR", str(tmp_path / "cache"))
+    plots._memoised_distribution.cache_clear()
+
+    # memoised, disk cache miss and disk cache hit all hand out arrays
+    # the caller may modify
+    for cache in (False, True, True):
+        data = get_plot_data({"sphere": [nifti]}, ShapeDistroModels.D2, cache)
+        bin_centers, hist = data["sphere"][0]
+        assert bin_centers.flags.writeable and hist.flags.writeable
+        hist /= hist.sum()
+
+    plots._memoised_distribution.cache_clear()
+
+
 def test_generate_comparison_plot(ultrasound_nifti_labels):
     # Prepare test data
     niftis = {
@@ -12,7 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
+
 import numpy as np
+import pytest
 from PIL import Image
 
 from radstract.data.colors import (
@@ -31,13 +34,39 @@ MULTI_COLOR_IMAGE = Image.new("RGB", (100, 100), (0, 0, 0))
 MULTI_COLOR_IMAGE.paste((255, 0, 0), (0, 0, 50, 50))
 MULTI_COLOR_IMAGE.paste((0, 255, 0), (50, 0, 100, 50))
 MULTI_COLOR_IMAGE.paste((0, 0, 255), (0, 50, 50, 100))
-COLORS = ((0, 255, 0), (255, 0, 0), (0, 0, 0), (0, 0, 255))
+COLORS = ((0, 0, 0), (0, 0, 255), (0, 255, 0), (255, 0, 0))
 
 SEGMENTATION_ARRAY = np.full((100, 100), 1, dtype=np.uint8)
 ALL_RED_ARRAY = np.full((100, 100, 3), (255, 0, 0), dtype=np.uint8)
 
 
-def test_label_colours():
+@pytest.fixture
+def label_colours(monkeypatch):
+    """
+    LabelColours working on copies of its class state, so colours a test
+    generates do not leak into later tests, with a short colour search.
+    """
+
+    monkeypatch.setattr(
+        LabelColours, "used_labels", list(LabelColours.used_labels)
+    )
+    monkeypatch.setattr(
+        LabelColours, "_colour_keys", dict(LabelColours._colour_keys)
+    )
+    monkeypatch.setattr(
+        LabelColours, "random", copy.deepcopy(LabelColours.random)
+    )
+    # rebuilt from the copied used_labels when first needed
+    monkeypatch.setattr(LabelColours, "_key_lut", None)
+    # reassigned rather than mutated, registered so they are restored
+    for name in ("_palette", "_used_array", "_spaced"):
+        monkeypatch.setattr(LabelColours, name, getattr(LabelColours, name))
+    monkeypatch.setattr(LabelColours, "_MAX_SEARCH_LABELS", 64)
+
+    return LabelColours
+
+
+def test_label_colours(label_colours):
     assert LabelColours.get_colour_key((0, 0, 0)) == 0
     assert LabelColours.get_colour_key((255, 0, 0)) == 1
     assert LabelColours.get_colour_key((0, 255, 0)) == 2
@@ -51,6 +80,39 @@ def test_label_colours():
     assert LabelColours.get_colour_key((111, 110, 218)) == 7
 
 
+def test_label_colours_beyond_spacing(label_colours):
+    # more labels than fit the minimum colour distance
+    colours = [LabelColours.get_color_from_index(i) for i in range(1, 41)]
+
+    assert len(set(colours)) == 40
+    assert LabelColours.get_colour_key(colours[-1]) == 40
+    assert LabelColours.get_colour_key((1, 2, 3)) is None
+
+
+def test_label_palette(label_colours):
+    palette = LabelColours.get_palette(8)
+
+    assert palette.shape == (8, 3)
+    assert palette.dtype == np.uint8
+    assert [tuple(colour) for colour in palette] == [
+        LabelColours.get_color_from_index(i) for i in range(8)
+    ]
+    assert np.array_equal(palette[SEGMENTATION_ARRAY], ALL_RED_ARRAY)
+
+
+def test_label_colour_keys(label_colours):
+    colours = LabelColours.get_palette(12).astype(np.uint32)
+    packed = (colours[:, 0] << 16) | (colours[:, 1] << 8) | colours[:, 2]
+
+    keys = LabelColours.get_colour_keys(packed.reshape(3, 4))
+
+    assert keys.dtype == np.uint16
+    assert keys.tolist() == np.arange(12).reshape(3, 4).tolist()
+
+    with pytest.raises(ValueError):
+        LabelColours.get_colour_keys(np.array([(1 << 16) | (2 << 8) | 3]))
+
+
 def test_get_unique_colours():
     assert (
         get_unique_colours(img=MULTI_COLOR_IMAGE) == COLORS
@@ -64,11 +126,44 @@ def test_change_color():
     assert change_color(ALL_BLACK, (0, 0, 0), (255, 255, 255)) == ALL_WHITE
 
 
-def test_convert_labels_to_image():
-    assert np.array_equal(
-        convert_labels_to_image(SEGMENTATION_ARRAY), ALL_RED_ARRAY
+def test_change_color_rgba():
+    data = np.zeros((4, 4, 4), dtype=np.uint8)
+    data[:2] = (255, 0, 0, 128)
+    data[2:] = (255, 0, 1, 128)
+
+    changed = np.asarray(
+        change_color(
+            Image.fromarray(data, "RGBA"), (255, 0, 0), (0, 0, 255, 255)
+        )
     )
 
+    # alpha is ignored when matching the old colour
+    assert (changed[:2] == (0, 0, 255, 255)).all()
+    assert (changed[2:] == (255, 0, 1, 128)).all()
+
+
+def test_change_color_rgba_matches_alpha():
+    data = np.zeros((2, 2, 4), dtype=np.uint8)
+    data[0] = (1, 2, 3, 255)
+    data[1] = (1, 2, 3, 0)
+
+    changed = np.asarray(
+        change_color(
+            Image.fromarray(data, "RGBA"), (1, 2, 3, 255), (9, 9, 9, 255)
+        )
+    )
+
+    # an RGBA old colour only matches pixels with the same alpha
+    assert (changed[0] == (9, 9, 9, 255)).all()
+    assert (changed[1] == (1, 2, 3, 0)).all()
+
+
+def test_convert_labels_to_image():
+    image = convert_labels_to_image(SEGMENTATION_ARRAY)
+
+    assert image.dtype == np.uint8
+    assert np.array_equal(image, ALL_RED_ARRAY)
+
 
 def test_all_black():
     assert fast_check_all_black(ALL_BLACK)
@@ -12,11 +12,22 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import importlib
+
 import numpy as np
 import pydicom
+import pytest
 from PIL import Image
+from pydicom.uid import JPEG2000Lossless
+
+from radstract.data.dicom import (
+    DicomTypes,
+    convert_dicom_to_images,
+    convert_images_to_dicom,
+)
+from radstract.data.images import crop_and_resize
 
-from radstract.data.dicom import convert_dicom_to_images
+dicom_main = importlib.import_module("radstract.data.dicom.main")
 
 
 def test_convert_dicom_to_images(ultrasound_dcm, ultrasound_label_slice0):
@@ -33,3 +44,107 @@ def test_convert_dicom_to_images(ultrasound_dcm, ultrasound_label_slice0):
 
     # NOTE(2024-04-20 Sharpz7) Slight difference in pixel values due to conversion
     assert np.allclose(np.array(images[0]), np.array(test_image), atol=3)
+
+
+def test_convert_dicom_to_images_threads(ultrasound_dcm):
+    old_dicom = pydicom.dcmread(ultrasound_dcm)
+
+    images = convert_dicom_to_images(old_dicom)
+    threaded = convert_dicom_to_images(old_dicom, threads=4)
+
+    assert len(threaded) == len(images)
+    for image, threaded_image in zip(images, threaded):
+        assert np.array_equal(np.array(image), np.array(threaded_image))
+
+
+def test_decode_frames_single_thread(monkeypatch):
+    frames = np.random.default_rng(0).integers(
+        0, 255, (3, 64, 64, 3), dtype=np.uint8
+    )
+    dicom = convert_images_to_dicom(
+        [Image.fromarray(frame) for frame in frames],
+        keyint=1,
+        compress_ratio=10,
+    )
+    expected = dicom.pixel_array
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("threads=1 must not start a thread pool")
+
+    monkeypatch.setattr(dicom_main, "ThreadPoolExecutor", no_pool)
+    # several CPUs, so only the threads argument keeps decoding sequential
+    monkeypatch.setattr(dicom_main.os, "cpu_count", lambda: 4)
+
+    assert np.array_equal(dicom_main._decode_frames(dicom, 1), expected)
+
+    # threads=1 keeps decoding and processing sequential
+    images = convert_dicom_to_images(dicom, noise_filters=[], threads=1)
+    assert np.array_equal(np.stack([np.array(i) for i in images]), expected)
+
+
+class _FakeImage:
+    def __init__(self, frame):
+        self.frame = frame
+
+    def cpu(self):
+        return self.frame
+
+
+@pytest.mark.parametrize("number_of_frames", [None, 1, 3])
+def test_decode_frames_gpu_shape(monkeypatch, number_of_frames):
+    frames = np.random.default_rng(0).integers(
+        0, 255, (number_of_frames or 1, 64, 64, 3), dtype=np.uint8
+    )
+    dicom = convert_images_to_dicom(
+        [Image.fromarray(frame) for frame in frames],
+        keyint=1,
+        transfer_syntax=JPEG2000Lossless,
+    )
+    if number_of_frames is None:
+        del dicom.NumberOfFrames
+    else:
+        dicom.NumberOfFrames = number_of_frames
+
+    # stands in for nvImageCodec, returning the frames it was given
+    class FakeDecoder:
+        def decode(self, encoded):
+            return [_FakeImage(frame) for frame in frames[: len(encoded)]]
+
+    fake_nvimgcodec = type("nvimgcodec", (), {"Decoder": FakeDecoder})
+    monkeypatch.setattr(dicom_main, "nvimgcodec", fake_nvimgcodec)
+    monkeypatch.delenv("RADSTRACT_DISABLE_CUDA", raising=False)
+
+    decoded = dicom_main._decode_frames_gpu(dicom)
+    assert decoded.shape == dicom.pixel_array.shape
+    assert np.array_equal(decoded, dicom.pixel_array)
+
+    # single frame datasets convert as DicomTypes.SINGLE
+    if len(frames) == 1:
+        images = convert_dicom_to_images(
+            dicom, dicom_type=DicomTypes.SINGLE, noise_filters=[]
+        )
+        assert np.array_equal(np.array(images[0]), frames[0])
+
+    # the environment switch keeps decoding on the CPU
+    monkeypatch.setenv("RADSTRACT_DISABLE_CUDA", "1")
+    assert dicom_main._decode_frames_gpu(dicom) is None
+
+
+@pytest.mark.parametrize(
+    "crop_coordinates", [(5, 4, 30, 20), (50, 30, 20, 20), (-3, 0, 10, 10)]
+)
+def test_convert_dicom_to_images_crop(crop_coordinates):
+    frames = np.random.default_rng(0).integers(
+        0, 255, (2, 40, 60, 3), dtype=np.uint8
+    )
+    images = [Image.fromarray(frame) for frame in frames]
+    dicom = convert_images_to_dicom(images, keyint=1)
+
+    cropped = convert_dicom_to_images(
+        dicom, crop_coordinates=crop_coordinates, compress_factor=2
+    )
+
+    # crops inside and past the frame edges match cropping each image
+    for image, cropped_image in zip(images, cropped):
+        expected = crop_and_resize(image, crop_coordinates, 2)
+        assert np.array_equal(np.array(cropped_image), np.array(expected))
@@ -19,6 +19,7 @@ import pydicom
 import pytest
 from PIL import Image
 from pydicom.dataset import FileMetaDataset
+from pydicom.uid import JPEG2000Lossless
 
 from radstract.data.dicom.exports import (
     PlaceHolderTag,
@@ -123,6 +124,26 @@ def test_add_tags(ultrasound_dcm):
     assert new_dicom.StudyID == old_dicom.StudyID
 
 
+def test_add_tags_nested_sequence():
+    old_item = pydicom.Dataset()
+    old_item.PatientID = "nested-id"
+    old_item.ReferencedSOPInstanceUID = "1.2.3.4"
+    old_dicom = pydicom.Dataset()
+    old_dicom.ReferencedStudySequence = pydicom.Sequence([old_item])
+
+    new_item = pydicom.Dataset()
+    new_item.PatientID = PlaceHolderTag.UseOldTagStr
+    new_item.ReferencedSOPInstanceUID = PlaceHolderTag.UseOldTagUID
+    new_dicom = pydicom.Dataset()
+    new_dicom.ReferencedStudySequence = pydicom.Sequence([new_item])
+
+    new_dicom = add_tags(new_dicom, old_dicom)
+
+    item = new_dicom.ReferencedStudySequence[0]
+    assert item.PatientID == "nested-id"
+    assert item.ReferencedSOPInstanceUID == "1.2.3.4"
+
+
 # NOTE(2024-04-20 Sharpz7) This filter can be made more specific in the
 # future by remaking the example dicoms
 @pytest.mark.filterwarnings("ignore:Tag")
@@ -151,3 +172,29 @@ def test_convert_images_to_dicom(ultrasound_label_slice0):
         assert np.allclose(
             loaded_dicom.pixel_array, np.array(test_image), atol=3
         )
+
+
+def test_convert_images_to_dicom_transfer_syntax():
+    rng = np.random.default_rng(0)
+    frames = rng.integers(0, 255, (3, 40, 60, 3), dtype=np.uint8)
+    images = [Image.fromarray(frame) for frame in frames]
+
+    new_dicom = convert_images_to_dicom(
+        images, keyint=1, transfer_syntax=JPEG2000Lossless
+    )
+
+    assert new_dicom.file_meta.TransferSyntaxUID == JPEG2000Lossless
+    assert np.array_equal(new_dicom.pixel_array, frames)
+
+
+def test_convert_images_to_dicom_array():
+    frames = np.random.default_rng(0).integers(
+        0, 255, (3, 40, 60, 3), dtype=np.uint8
+    )
+    images = [Image.fromarray(frame) for frame in frames]
+
+    from_images = convert_images_to_dicom(images, keyint=1)
+    from_array = convert_images_to_dicom(frames, keyint=1)
+
+    assert from_array.NumberOfFrames == 3
+    assert from_array.PixelData == from_images.PixelData
@@ -12,16 +12,23 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import importlib
+
 import cv2
 import numpy as np
+import pytest
 from PIL import Image
 
 from radstract.data.images import (
+    NoiseReducer,
     NoiseReductionFilter,
     crop_and_resize,
     reduce_noise,
+    stack_images,
 )
 
+filters_module = importlib.import_module("radstract.data.images.filters")
+
 ALL_BLACK = Image.new("RGB", (100, 100), (0, 0, 0))
 CROPPED_AND_RESIZED_ALL_BLACK = Image.new("RGB", (50, 50), (0, 0, 0))
 
@@ -34,6 +41,121 @@ def test_crop_and_resize():
     assert crop_and_resize(ALL_BLACK, compress_factor=2) == ALL_BLACK
 
 
+def test_stack_images():
+    images = [Image.new("RGB", (4, 3), (i, 0, 0)) for i in range(5)]
+
+    stacked = stack_images(images)
+
+    assert stacked.shape == (5, 3, 4, 3)
+    assert stacked.dtype == np.uint8
+    assert np.array_equal(stacked, np.array([np.array(i) for i in images]))
+
+    with pytest.raises(ValueError):
+        stack_images([])
+
+
+def test_reduce_noise_no_filters():
+    # a greyscale image would fail the RGB to BGR conversion
+    img = Image.new("L", (10, 10), 7)
+
+    assert reduce_noise(img, []) is img
+
+
+def test_reduce_noise_results_are_independent():
+    # scratch memory is reused between calls, earlier results must not
+    # change, including greyscale ones PIL would otherwise wrap in place
+    for mode, shape in (("RGB", (20, 30, 3)), ("L", (20, 30))):
+        first = reduce_noise(
+            Image.fromarray(np.full(shape, 100, np.uint8)),
+            [NoiseReductionFilter.MEDIAN_FILTER(size=3)],
+        )
+        reduce_noise(
+            Image.fromarray(np.full(shape, 7, np.uint8)),
+            [NoiseReductionFilter.MEDIAN_FILTER(size=3)],
+        )
+
+        assert first.mode == mode
+        assert np.all(np.array(first) == 100)
+
+
+def test_noise_reducer_matches_reduce_noise():
+    filters = [
+        NoiseReductionFilter.MEDIAN_FILTER(size=3),
+        NoiseReductionFilter.GAUSSIAN_BLUR((3, 3)),
+        NoiseReductionFilter.LAMBDA_FILTER(lambda image: image // 2),
+        NoiseReductionFilter.MEDIAN_FILTER(size=3),
+    ]
+    reducer = NoiseReducer(filters)
+    rng = np.random.default_rng(0)
+
+    # earlier results keep their values while the reducer is reused, for
+    # every channel count
+    for shape in ((20, 30, 3), (20, 30), (20, 30, 4)):
+        images = [
+            Image.fromarray(rng.integers(0, 255, shape, dtype=np.uint8))
+            for _ in range(3)
+        ]
+        reduced = [reducer.reduce(image) for image in images]
+
+        for image, result in zip(images, reduced):
+            expected = reduce_noise(image, filters)
+            assert np.array_equal(np.array(result), np.array(expected))
+
+
+def test_noise_reducer_lambda_inputs_are_kept():
+    seen = []
+
+    def keep(image):
+        seen.append(image)
+        return image
+
+    filters = [
+        NoiseReductionFilter.MEDIAN_FILTER(size=3),
+        NoiseReductionFilter.LAMBDA_FILTER(keep),
+        NoiseReductionFilter.GAUSSIAN_BLUR((3, 3)),
+        NoiseReductionFilter.LAMBDA_FILTER(keep),
+        NoiseReductionFilter.MEDIAN_FILTER(size=3),
+    ]
+    reducer = NoiseReducer(filters)
+
+    for value in (10, 200):
+        reducer.reduce(Image.new("RGB", (10, 10), (value,) * 3))
+
+    # arrays given to LAMBDA_FILTER functions are never reused
+    assert [int(image[0, 0, 0]) for image in seen] == [10, 10, 200, 200]
+
+
+def test_reduce_noise_cuda_selection(monkeypatch):
+    gpu_calls = []
+
+    def fake_reduce_noise_cuda(image_cv, filters_compose):
+        gpu_calls.append(image_cv.shape)
+        return image_cv
+
+    monkeypatch.setattr(filters_module, "_cuda_available", lambda: True)
+    monkeypatch.setattr(
+        filters_module, "_reduce_noise_cuda", fake_reduce_noise_cuda
+    )
+    median = [NoiseReductionFilter.MEDIAN_FILTER(size=3)]
+
+    # only 3 channel images go to the GPU
+    reduce_noise(Image.new("RGB", (10, 10)), median)
+    assert gpu_calls == [(10, 10, 3)]
+
+    # greyscale and RGBA images are filtered on the CPU instead
+    for mode in ("L", "RGBA"):
+        image = Image.new(mode, (10, 10), 50)
+        filtered = reduce_noise(image, median)
+        assert filtered.mode == mode
+        assert np.array_equal(np.array(filtered), np.array(image))
+    assert len(gpu_calls) == 1
+
+    # the GPU can be switched off entirely
+    monkeypatch.setenv("RADSTRACT_DISABLE_CUDA", "1")
+    reduce_noise(Image.new("RGB", (10, 10)), median)
+    assert len(gpu_calls) == 1
+
+
 def test_reduce_noise(ultrasound_label_slice0, ultrasound_label_slice0_noise):
     img = Image.open(ultrasound_label_slice0)
     noise_reduced_img = Image.open(ultrasound_label_slice0_noise)
@@ -32,3 +32,14 @@ def test_remove_black_frames():
     assert len(nifti_list) == 1
     assert dicom_list[0] == NON_LABELLED_IMAGE
     assert nifti_list[0] == LABELLED_IMAGE
+
+
+def test_remove_black_frames_different_sizes():
+    small_black = Image.new("RGB", (50, 50), (0, 0, 0))
+    dicom_list = [ALL_BLACK, NON_LABELLED_IMAGE, small_black]
+    nifti_list = [LABELLED_IMAGE, small_black, ALL_BLACK]
+
+    dicom_list, nifti_list = remove_black_frames(dicom_list, nifti_list)
+
+    assert dicom_list == [ALL_BLACK]
+    assert nifti_list == [LABELLED_IMAGE]
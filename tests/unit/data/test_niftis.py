@@ -20,6 +20,7 @@ from radstract.data.nifti import (
     NIFTI_Types,
     convert_images_to_nifti_labels,
     convert_nifti_to_image_labels,
+    convert_nifti_to_images,
 )
 
 
@@ -68,3 +69,50 @@ def test_convert_images_to_nifti_labels_with_mock_data(nii_test_data):
     assert (
         nifti.type == NIFTI_Types.NIBABEL
     ), "NIFTI type should be set correctly"
+
+
+def test_convert_images_to_nifti_labels_round_trip():
+    data = np.zeros((12, 8, 3), dtype=np.uint8)
+    data[2:6, 1:4, 0] = 1
+    data[5:11, 3:7, 1] = 2
+    data[0:3, 5:8, 2] = 5
+
+    images, _ = convert_nifti_to_image_labels(
+        nib.Nifti1Image(data, np.diag([-1, -1, 1, 1]))
+    )
+    nifti = convert_images_to_nifti_labels(images)
+
+    result = np.asanyarray(nifti.image.dataobj)
+    assert result.dtype == np.uint8
+    assert np.array_equal(result, data)
+
+
+def test_convert_nifti_to_image_labels_threads():
+    data = np.zeros((12, 8, 5), dtype=np.uint8)
+    data[2:6, 1:4, ::2] = 1
+    data[5:11, 3:7, 1:] = 3
+    nii = nib.Nifti1Image(data, np.diag([-1, -1, 1, 1]))
+
+    serial, _ = convert_nifti_to_image_labels(nii, (1, 1, 10, 6), 2)
+    threaded, _ = convert_nifti_to_image_labels(
+        nii, (1, 1, 10, 6), 2, threads=3
+    )
+
+    assert len(threaded) == len(serial)
+    for serial_image, threaded_image in zip(serial, threaded):
+        assert np.array_equal(np.array(serial_image), np.array(threaded_image))
+
+
+def test_convert_nifti_to_images_grayscale():
+    data = np.random.default_rng(0).integers(
+        0, 255, (12, 8, 4), dtype=np.uint8
+    )
+    rgb_data = np.repeat(data[:, :, :, np.newaxis, np.newaxis], 3, axis=4)
+
+    grayscale, _ = convert_nifti_to_images(nib.Nifti1Image(data, np.eye(4)))
+    rgb, _ = convert_nifti_to_images(nib.Nifti1Image(rgb_data, np.eye(4)))
+
+    assert len(grayscale) == len(rgb) == 4
+    for grayscale_image, rgb_image in zip(grayscale, rgb):
+        assert grayscale_image.mode == "RGB"
+        assert np.array_equal(np.array(grayscale_image), np.array(rgb_image))
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import numpy as np
+import pytest
 from PIL import Image
 
 from radstract.datasets.polygon_utils import (
@@ -104,3 +105,25 @@ def test_segmentation_to_polygons():
 
     # Assert that the returned polygons match the expected polygons
     assert polygons == expected_polygons
+
+
+def test_segmentation_to_polygons_non_rgb_masks():
+    seg_image = create_test_segmentation_image()
+    expected_polygons = segmentation_to_polygons(seg_image)
+
+    # Palette and RGBA masks give the same polygons as the RGB mask
+    palette_image = seg_image.quantize(colors=4)
+    assert segmentation_to_polygons(palette_image) == expected_polygons
+    assert (
+        segmentation_to_polygons(seg_image.convert("RGBA"))
+        == expected_polygons
+    )
+
+    # Greyscale masks are read as grey RGB colours
+    grey_image = Image.fromarray(
+        np.array([[0, 0, 0], [0, 0, 0], [0, 0, 0]], dtype=np.uint8)
+    )
+    assert segmentation_to_polygons(grey_image) == {}
+
+    with pytest.raises(ValueError):
+        segmentation_to_polygons(np.zeros((3, 3), dtype=np.uint8))
@@ -12,9 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import numpy as np
 import pytest
 
-from radstract.math import smart_find_intersection
+from radstract.math import (
+    smart_find_intersection,
+    smart_find_intersection_batch,
+)
 
 
 def test_smart_find_intersection():
@@ -46,3 +50,30 @@ def test_smart_find_intersection():
     point4 = (2, 6)
     with pytest.raises(ValueError, match="Lines are parallel"):
         smart_find_intersection(point1, point2, point3, point4)
+
+
+def test_smart_find_intersection_batch():
+    points1a = np.array([(0, 0), (2, 0), (0, 2), (1, 0)])
+    points1b = np.array([(4, 4), (2, 4), (4, 2), (3, 7)])
+    points2a = np.array([(0, 4), (0, 2), (2, 0), (0, 5)])
+    points2b = np.array([(4, 0), (4, 2), (2, 4), (9, 1)])
+
+    intersections = smart_find_intersection_batch(
+        points1a, points1b, points2a, points2b
+    )
+
+    expected = [
+        smart_find_intersection(*points)
+        for points in zip(points1a, points1b, points2a, points2b)
+    ]
+
+    assert intersections.tolist() == [list(point) for point in expected]
+
+    # Two vertical lines (raises ValueError)
+    with pytest.raises(ValueError, match="Lines are parallel"):
+        smart_find_intersection_batch(
+            [(0, 0), (2, 0)],
+            [(4, 4), (2, 4)],
+            [(0, 4), (2, 2)],
+            [(4, 0), (2, 6)],
+        )